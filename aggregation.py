@@ -0,0 +1,144 @@
+# aggregation.py
+import math
+
+# Columns the summary sheets group by, and the columns they total
+SUMMARY_GROUPS = ["Party Name", "Agent", "Mkt Committee", "City"]
+SUMMARY_MEASURES = ["Bags", "Bill Wt (Qtl)", "Shortage Amt", "Raw Material Value"]
+
+BLANK_GROUP = "(blank)"
+
+
+def _number(value):
+    """A cell as a number for totals; text and error values count as nothing, like SUM()."""
+    if value.__class__ is float:
+        return value if value == value else None
+    if isinstance(value, int) and not isinstance(value, bool):
+        return float(value)
+    if isinstance(value, str) and value:
+        try:
+            return float(value.replace(",", ""))
+        except ValueError:
+            return None
+    return None
+
+
+class GroupTotals:
+    """
+    Lot counts and column totals per group for several groupings at once,
+    built in one pass over the rows with a hash table per grouping.
+
+    Group names that differ only in case or spacing are one group, shown
+    as first seen.
+    """
+
+    def __init__(self, columns, groups=SUMMARY_GROUPS, measures=SUMMARY_MEASURES):
+        offsets = {col: idx for idx, col in enumerate(columns)}
+        self.groups = [col for col in groups if col in offsets]
+        self.measures = [col for col in measures if col in offsets]
+        self._group_slots = [offsets[col] for col in self.groups]
+        self._measure_slots = [offsets[col] for col in self.measures]
+        self._tables = [{} for _ in self.groups]  # per grouping: name as typed or folded -> [label, count, sums...]
+        self.rows = 0
+
+    def add_row(self, row, lots=1):
+        """Add one row; or, with ``lots``, a row of totals over that many lots."""
+        size = len(row)
+        numbers = [_number(row[idx]) if idx < size else None for idx in self._measure_slots]
+        for group_idx, table in zip(self._group_slots, self._tables):
+            name = row[group_idx] if group_idx < size else None
+            if name.__class__ is not str:
+                name = "" if name is None else str(name)
+            entry = table.get(name)
+            if entry is None:
+                # First time this exact spelling is seen: file it under its folded name
+                label = " ".join(name.split()) or BLANK_GROUP
+                entry = table.get(label.casefold())
+                if entry is None:
+                    entry = table[label.casefold()] = [label, 0] + [0.0] * len(numbers)
+                table[name] = entry
+            entry[1] += lots
+            for pos, number in enumerate(numbers, start=2):
+                if number is not None:
+                    entry[pos] += number
+        self.rows += 1
+
+    def add_rows(self, rows):
+        for row in rows:
+            self.add_row(row)
+        return self
+
+    def results(self):
+        """
+        {group column: [(name, lots, total, ...), ...]} sorted by name; totals
+        follow ``measures``.
+        """
+        summaries = {}
+        for col, table in zip(self.groups, self._tables):
+            unique = {id(entry): entry for entry in table.values()}.values()
+            summaries[col] = sorted((tuple(entry) for entry in unique), key=lambda r: r[0].casefold())
+        return summaries
+
+
+def summarise(columns, rows, groups=SUMMARY_GROUPS, measures=SUMMARY_MEASURES):
+    """Totals of ``rows`` (lists in ``columns`` order) per group; see GroupTotals.results()."""
+    totals = GroupTotals(columns, groups, measures).add_rows(rows)
+    return totals.results(), totals.measures
+
+
+# Columns totalled in the footer under the TreeView
+FOOTER_MEASURES = ["Bags", "Bill Wt (Qtl)", "Kanda Wt with Bardana(Qtl)",
+                   "Total Bill Amt (Rounded Off)", "Shortage Amt", "Raw Material Value"]
+
+
+class RunningTotals:
+    """
+    Totals of a few columns over the current batch, kept up to date by applying
+    each change as a delta (add a row, take an old row away) instead of
+    re-adding every row.
+    """
+
+    def __init__(self, columns, measures=FOOTER_MEASURES):
+        offsets = {col: idx for idx, col in enumerate(columns)}
+        self.measures = [col for col in measures if col in offsets]
+        self._slots = [offsets[col] for col in self.measures]
+        self.lots = 0
+        self.sums = [0.0] * len(self.measures)
+
+    def _apply(self, row, sign):
+        size = len(row)
+        sums = self.sums
+        for pos, idx in enumerate(self._slots):
+            number = _number(row[idx]) if idx < size else None
+            if number is not None:
+                sums[pos] += sign * number
+
+    def add(self, row):
+        self.lots += 1
+        self._apply(row, 1)
+
+    def remove(self, row):
+        self.lots -= 1
+        if self.lots <= 0:
+            self.clear()  # nothing left: drop any rounding residue as well
+        else:
+            self._apply(row, -1)
+
+    def replace(self, old_row, new_row):
+        self._apply(old_row, -1)
+        self._apply(new_row, 1)
+
+    def clear(self):
+        self.lots = 0
+        self.sums = [0.0] * len(self.measures)
+
+    def reset(self, store):
+        """Total a whole RowStore again (after an import, a restore or a formula change)."""
+        self.lots = len(store)
+        self.sums = []
+        for col in self.measures:
+            numbers = (_number(value) for value in store.column_values(col))
+            self.sums.append(math.fsum(number for number in numbers if number is not None))
+
+    def totals(self):
+        """[(column, total), ...] in ``measures`` order."""
+        return list(zip(self.measures, self.sums))
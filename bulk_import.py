@@ -0,0 +1,296 @@
+# bulk_import.py
+import csv
+import os
+from datetime import date
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import chain
+import openpyxl
+from column_schema import COLUMNS, ColumnSchema, DATE
+from ledger import date_key
+
+IMPORT_EXTENSIONS = (".xlsx", ".csv")
+
+# Rows at the top of a file searched for the header (CSV dumps may start with a title)
+HEADER_SCAN_ROWS = 10
+
+# Headers used by other software (weighbridge CSV dumps), compared after normalise_header()
+HEADER_ALIASES = {
+    "date": "Arrival Lot date",
+    "arrivaldate": "Arrival Lot date",
+    "lotdate": "Arrival Lot date",
+    "billnumber": "Bill No.",
+    "invoiceno": "Bill No.",
+    "invoicedate": "Bill Date",
+    "party": "Party Name",
+    "partyname": "Party Name",
+    "supplier": "Party Name",
+    "broker": "Agent",
+    "mandi": "Mkt Committee",
+    "marketcommittee": "Mkt Committee",
+    "vehicle": "Vehicle No.",
+    "truckno": "Vehicle No.",
+    "lorryno": "Vehicle No.",
+    "noofbags": "Bags",
+}
+
+
+def normalise_header(name):
+    """'Vehicle No.', 'VEHICLE NO' and 'vehicle_no' all become 'vehicleno'."""
+    return re.sub(r"[^0-9a-z]", "", str(name).casefold())
+
+
+def map_headers(header, schema):
+    """
+    Match a file's header row to the schema's input columns.
+    Formula columns are left out: they are recomputed after the import.
+    :return: [(position in the file, offset in the schema), ...]
+    """
+    targets = {normalise_header(col): col for col in schema.columns}
+    for alias, col in HEADER_ALIASES.items():
+        targets.setdefault(alias, col)
+    formula = set(schema.formula_columns)
+    slots, taken = [], set()
+    for position, name in enumerate(header):
+        if name is None:
+            continue
+        col = targets.get(normalise_header(name))
+        if col is None or col in formula or col in taken:
+            continue
+        taken.add(col)
+        slots.append((position, schema.offsets[col]))
+    return slots
+
+
+def _read_csv(path):
+    """Rows of a CSV file as lists of cells, in whichever dialect it was written."""
+    with open(path, "r", newline="", encoding="utf-8-sig", errors="replace") as f:
+        sample = f.read(4096)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t|")
+        except csv.Error:
+            dialect = csv.excel
+        yield from csv.reader(f, dialect)
+
+
+class FileRows:
+    """
+    The rows of one workbook (first sheet) or CSV file in schema order, read
+    lazily as they are iterated: parse_file() reads them all in a worker
+    process, View Data a chunk at a time. The header is found when the file is
+    opened, so a file with no known columns fails before anything is read.
+    ``suggestions`` and ``blank`` (rows with none of the mapped columns) cover
+    the rows read so far; ``total`` is the number of data rows the workbook
+    declares, or None (CSV files).
+    """
+
+    def __init__(self, path, schema, suggestion_fields=()):
+        self.path = path
+        self.schema = schema
+        self.suggestions = {field: set() for field in suggestion_fields if field in schema}
+        self.blank = 0
+        self.total = None
+        self._wb = None
+        if path.lower().endswith(".csv"):
+            self._rows = _read_csv(path)
+        else:
+            self._wb = openpyxl.load_workbook(path, read_only=True, data_only=False)
+            ws = self._wb.active
+            if ws.max_row:
+                self.total = ws.max_row
+            self._rows = iter(ws.iter_rows(values_only=True))
+
+        # The header is the row among the first few that names the most columns
+        try:
+            head = []
+            for row in self._rows:
+                head.append(row)
+                if len(head) >= HEADER_SCAN_ROWS:
+                    break
+            best, self.slots = 0, []
+            for idx, row in enumerate(head):
+                found = map_headers(row, schema)
+                if len(found) > len(self.slots):
+                    best, self.slots = idx, found
+            if not self.slots:
+                raise ValueError("no known column headers")
+        except Exception:
+            self.close()
+            raise
+        self._head = head[best + 1:]
+        if self.total is not None:
+            self.total = max(self.total - best - 1, 0)
+
+    def close(self):
+        """Release the file; reading stops here. Safe to call more than once."""
+        rows, self._rows = self._rows, iter(())
+        if hasattr(rows, "close"):
+            rows.close()
+        if self._wb is not None:
+            self._wb.close()
+            self._wb = None
+
+    def __iter__(self):
+        schema = self.schema
+        slots = self.slots
+        suggestion_slots = [(schema.offsets[field], seen) for field, seen in self.suggestions.items()]
+        types = [schema.types[col] for col in schema.columns]
+        width = len(schema.columns)
+
+        head, self._head = self._head, []
+        for row in chain(head, self._rows):
+            values = [""] * width
+            filled = False
+            for position, offset in slots:
+                if position >= len(row):
+                    continue
+                value = row[position]
+                if value is None:
+                    continue
+                if isinstance(value, str):
+                    value = value.strip()
+                    if not value:
+                        continue
+                    if types[offset] != DATE:
+                        value = schema.parse(schema.columns[offset], value)
+                elif isinstance(value, date) and types[offset] == DATE:
+                    # openpyxl reads real date cells as datetime; rows hold dates as typed text
+                    value = schema.parse(schema.columns[offset], value)
+                values[offset] = value
+                filled = True
+            if not filled:
+                self.blank += 1
+                continue
+            for offset, seen in suggestion_slots:
+                if values[offset]:
+                    seen.add(str(values[offset]))
+            yield values
+
+
+def parse_file(path, spec=COLUMNS, suggestion_fields=()):
+    """
+    Read one file into rows in schema order (runs in a worker process).
+    :return: dict with the rows, the values seen in ``suggestion_fields``
+             and the number of rows that had none of the mapped columns
+    """
+    reader = FileRows(path, ColumnSchema(spec), suggestion_fields)
+    try:
+        rows = list(reader)
+    finally:
+        reader.close()
+    return {"rows": rows, "suggestions": reader.suggestions, "blank": reader.blank}
+
+
+def key_slots(schema):
+    """(offset, is a date) of the input columns that make up a row_key()."""
+    formula = set(schema.formula_columns)
+    return [
+        (offset, schema.types[col] == DATE)
+        for offset, col in enumerate(schema.columns) if col not in formula
+    ]
+
+
+def row_key(values, slots):
+    """What makes two imported rows the same lot: their input values, normalised."""
+    key = []
+    for offset, is_date in slots:
+        value = values[offset] if offset < len(values) else ""
+        if is_date:
+            value = date_key(value) or value
+        elif isinstance(value, float) and value.is_integer():
+            value = int(value)
+        key.append(" ".join(str(value).split()).casefold())
+    return tuple(key)
+
+
+def find_import_files(folder):
+    """Workbooks and CSV files directly inside ``folder``, by name (Excel lock files skipped)."""
+    return [
+        os.path.join(folder, name) for name in sorted(os.listdir(folder))
+        if name.lower().endswith(IMPORT_EXTENSIONS) and not name.startswith("~$")
+    ]
+
+
+class BulkImportJob:
+    """
+    Parses many files in a process pool and merges them into one list of rows,
+    dropping rows that repeat one already seen (in an earlier file or in
+    ``existing_rows``). Like ExportJob, a thread drives the work and the Tk side
+    polls ``files_done``/``done``; nothing here touches widgets.
+    """
+
+    def __init__(self, paths, schema, existing_rows=(), suggestion_fields=(), workers=None):
+        self.paths = list(paths)
+        self.schema = schema
+        self.suggestion_fields = list(suggestion_fields)
+        self.workers = workers or min(len(self.paths), os.cpu_count() or 1) or 1
+        self.total = len(self.paths)
+        self.files_done = 0
+        self.rows = []
+        self.duplicates = 0
+        self.blank = 0
+        self.suggestions = {field: set() for field in self.suggestion_fields}
+        self.failed = []  # (path, error) of files that could not be read
+        self.done = False
+        self.cancelled = False
+        self.error = None
+        self.existing_rows = existing_rows  # rows or a RowStore.snapshot(), read on the worker thread
+        self._cancel_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="bulk-import", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def wait(self):
+        self._thread.join()
+        return self
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    def _run(self):
+        results = {}
+        try:
+            slots = key_slots(self.schema)
+            keys = {row_key(values, slots) for values in self.existing_rows}
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                futures = {
+                    pool.submit(parse_file, path, self.schema.spec, self.suggestion_fields): path
+                    for path in self.paths
+                }
+                for future in as_completed(futures):
+                    if self._cancel_event.is_set():
+                        for pending in futures:
+                            pending.cancel()
+                        self.cancelled = True
+                        return
+                    path = futures[future]
+                    try:
+                        results[path] = future.result()
+                    except Exception as e:
+                        self.failed.append((path, e))
+                    self.files_done += 1
+
+            # Merge in file name order, so the kept copy of a repeated row is the earliest
+            for path in self.paths:
+                result = results.get(path)
+                if result is None:
+                    continue
+                self.blank += result["blank"]
+                for field, values in result["suggestions"].items():
+                    self.suggestions[field].update(values)
+                for values in result["rows"]:
+                    key = row_key(values, slots)
+                    if key in keys:
+                        self.duplicates += 1
+                        continue
+                    keys.add(key)
+                    self.rows.append(values)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+
@@ -0,0 +1,102 @@
+# column_schema.py
+from datetime import date
+
+# What a column holds
+DATE, INT, FLOAT, TEXT = "date", "int", "float", "text"
+
+# How dates are typed in the entry boxes and kept in the rows
+DATE_FORMAT = "%d/%m/%Y"
+
+# Where its value comes from
+GLOBAL, ROW, FORMULA = "global", "row", "formula"
+
+# Every column in its final (exported) order: (name, source, type)
+COLUMNS = [
+    ("Arrival Lot date", ROW, DATE),
+    ("MRN No.", FORMULA, INT),
+    ("Bill No.", ROW, TEXT),
+    ("Bill Date", ROW, DATE),
+    ("Agent", ROW, TEXT),
+    ("Party Name", ROW, TEXT),
+    ("City", ROW, TEXT),
+    ("Mkt Committee", ROW, TEXT),
+    ("Vehicle No.", ROW, TEXT),
+    ("Bags", ROW, INT),
+    ("Bill Wt (Qtl)", ROW, FLOAT),
+    ("Kanda Wt with Bardana(Qtl)", ROW, FLOAT),
+    ("Kanda Wt without Bardana(Qtl)", FORMULA, FLOAT),
+    ("Basic Rate as per Bill", GLOBAL, FLOAT),
+    ("Bill Basic Amt", FORMULA, FLOAT),
+    ("Dami Amt", FORMULA, FLOAT),
+    ("Other Amt", ROW, FLOAT),
+    ("Other Crs amt", FORMULA, FLOAT),
+    ("Total Bill Amt (Rounded Off)", FORMULA, FLOAT),
+    ("Cost as per Bill", FORMULA, FLOAT),
+    ("Sauda", GLOBAL, FLOAT),
+    ("Moist(%)", GLOBAL, FLOAT),
+    ("Fungus", GLOBAL, FLOAT),
+    ("Broken", GLOBAL, FLOAT),
+    ("Shortage", FORMULA, FLOAT),
+    ("Shortage Amt", FORMULA, FLOAT),
+    ("Rate Diff (per Qtl)", FORMULA, FLOAT),
+    ("Rate Diff Amt", FORMULA, FLOAT),
+    ("Fungus Cut", FORMULA, FLOAT),
+    ("Broken Cut", FORMULA, FLOAT),
+    ("Moisture Cut", FORMULA, FLOAT),
+    ("Raw Material Value", FORMULA, FLOAT),
+]
+
+
+class ColumnSchema:
+    """
+    The columns of a row: their order, where each value comes from and what it holds.
+
+    ``offsets`` maps a column name to its position, so code that has a name
+    finds the cell without searching the column list.
+    """
+
+    __slots__ = ("spec", "columns", "offsets", "types", "global_columns", "row_columns",
+                 "formula_columns", "numeric_columns", "date_columns")
+
+    def __init__(self, spec=COLUMNS):
+        self.spec = list(spec)
+        self.columns = [name for name, _, _ in spec]
+        self.offsets = {name: idx for idx, name in enumerate(self.columns)}
+        self.types = {name: kind for name, _, kind in spec}
+        self.global_columns = [name for name, source, _ in spec if source == GLOBAL]
+        self.row_columns = [name for name, source, _ in spec if source == ROW]
+        self.formula_columns = [name for name, source, _ in spec if source == FORMULA]
+        self.numeric_columns = [name for name, _, kind in spec if kind in (INT, FLOAT)]
+        self.date_columns = [name for name, _, kind in spec if kind == DATE]
+
+    def __len__(self):
+        return len(self.columns)
+
+    def __contains__(self, name):
+        return name in self.offsets
+
+    def parse(self, name, text):
+        """
+        Typed value of a column from the text of an entry box. Numbers are parsed
+        once here (commas allowed); anything that does not parse is kept as typed,
+        so validation can report it. A date object (an Excel date cell) becomes
+        DD/MM/YYYY text, as if it had been typed.
+        """
+        if isinstance(text, str):
+            text = text.strip()
+        kind = self.types.get(name)
+        if kind == DATE and isinstance(text, date):
+            return text.strftime(DATE_FORMAT)
+        if kind not in (INT, FLOAT) or not isinstance(text, str) or not text:
+            return text
+        try:
+            number = float(text.replace(",", ""))
+        except ValueError:
+            return text
+        if number != number or number in (float("inf"), float("-inf")):
+            return text
+        return number
+
+    def record(self, values):
+        """A row as a list in column order from {column: value}; missing columns are blank."""
+        return [values.get(name, "") for name in self.columns]
@@ -0,0 +1,236 @@
+# duplicates.py
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from array import array
+import openpyxl
+from path_utils import get_resource_path
+from excel_handler import EXPORT_FOLDER
+from ledger import date_key
+
+# Hashes of every key already submitted, and which sources they came from
+HISTORY_CACHE = get_resource_path("duplicate_keys.bin")
+HISTORY_MANIFEST = get_resource_path("duplicate_keys.json")
+
+# (label, columns) of each key checked for duplicates
+DUPLICATE_KEYS = [
+    ("Bill No. and Party Name", ("Bill No.", "Party Name")),
+    ("Vehicle No. and Arrival Lot date", ("Vehicle No.", "Arrival Lot date")),
+]
+DATE_COLUMNS = {"Arrival Lot date", "Bill Date"}
+
+
+def _normalise(col, value):
+    if value is None:
+        return ""
+    if col in DATE_COLUMNS:
+        return date_key(value) or str(value).strip()
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)  # a bill number read back from Excel as 1234.0
+    return " ".join(str(value).split()).casefold()
+
+
+def key_hashes(get):
+    """
+    64-bit hashes of the duplicate keys of one row; ``get(col)`` returns a cell value.
+    Keys with an empty part are skipped. Returns [(label, hash), ...].
+    """
+    hashes = []
+    for label, cols in DUPLICATE_KEYS:
+        parts = [_normalise(col, get(col)) for col in cols]
+        if all(parts):
+            text = label + "\x1f" + "\x1f".join(parts)
+            digest = hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+            hashes.append((label, int.from_bytes(digest, "little")))
+    return hashes
+
+
+class DuplicateIndex:
+    """
+    Hash sets of (Bill No., Party Name) and (Vehicle No., Arrival Lot date) keys,
+    for the current batch and for everything submitted before.
+
+    Keys are kept as 64-bit hashes, so a lookup is one set probe however much
+    history there is, and a million lots cost tens of megabytes. History comes
+    from the ledger and the workbooks in the exports folder; the hashes are
+    cached on disk and only new lots or files are read at startup, on a
+    background thread.
+    """
+
+    def __init__(self, ledger=None, export_folder=EXPORT_FOLDER,
+                 cache_path=HISTORY_CACHE, manifest_path=HISTORY_MANIFEST):
+        self.ledger = ledger
+        self.export_folder = export_folder
+        self.cache_path = cache_path
+        self.manifest_path = manifest_path
+        self.history = set()
+        self.loading = False
+        self._batch_counts = {}  # hash -> number of batch rows with that key
+        self._row_keys = {}      # row id -> [hash, ...]
+        self._lock = threading.Lock()
+
+    # --- Lookups ---
+
+    def check(self, get, ignore_row=None):
+        """Labels of the keys of a row that already exist (``ignore_row``: the row being edited)."""
+        own = set(self._row_keys.get(ignore_row, ()))
+        found = []
+        for label, key in key_hashes(get):
+            in_batch = self._batch_counts.get(key, 0) - (1 if key in own else 0)
+            if in_batch > 0:
+                found.append(f"{label} already entered in this batch")
+            elif key in self.history:
+                found.append(f"{label} already submitted earlier")
+        return found
+
+    # --- Current batch ---
+
+    def add_row(self, row_id, get):
+        keys = [key for _, key in key_hashes(get)]
+        self._row_keys[row_id] = keys
+        for key in keys:
+            self._batch_counts[key] = self._batch_counts.get(key, 0) + 1
+
+    def remove_row(self, row_id):
+        for key in self._row_keys.pop(row_id, ()):
+            count = self._batch_counts.get(key, 0) - 1
+            if count > 0:
+                self._batch_counts[key] = count
+            else:
+                self._batch_counts.pop(key, None)
+
+    def rebuild_batch(self, store):
+        """Re-index every row of a RowStore (after an import, restore or clear)."""
+        self._batch_counts = {}
+        self._row_keys = {}
+        for index in range(len(store)):
+            self.add_row(store.row_id(index), lambda col, index=index: store.get(index, col))
+
+    def submitted(self, rows, columns):
+        """Rows were saved: their keys now belong to the history."""
+        col_index = {col: idx for idx, col in enumerate(columns)}
+        keys = []
+        for row in rows:
+            keys.extend(key for _, key in key_hashes(
+                lambda col: row[col_index[col]] if col in col_index and col_index[col] < len(row) else None))
+        self._add_history(keys)
+
+    def submitted_store(self, store):
+        """Like submitted(), for the rows of a RowStore (reads only the key columns)."""
+        keys = []
+        for index in range(len(store)):
+            keys.extend(key for _, key in key_hashes(lambda col: store.get(index, col)))
+        self._add_history(keys)
+
+    # --- History ---
+
+    def load_history(self):
+        """Start loading history on a background thread; lookups use what is loaded so far."""
+        self.loading = True
+        threading.Thread(target=self._load_history, name="duplicate-history", daemon=True).start()
+
+    def _load_history(self):
+        try:
+            manifest = self._read_cache()
+            changed = self._load_ledger(manifest)
+            changed = self._load_exports(manifest) or changed
+            if changed:
+                with self._lock:
+                    with open(self.manifest_path + ".tmp", "w", encoding="utf-8") as f:
+                        json.dump(manifest, f)
+                    os.replace(self.manifest_path + ".tmp", self.manifest_path)
+        except Exception as e:
+            print(f"Error loading duplicate history: {e}")
+        finally:
+            self.loading = False
+
+    def _read_cache(self):
+        manifest = {"ledger_id": 0, "files": {}}
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest.update(json.load(f))
+            hashes = array("Q")
+            with open(self.cache_path, "rb") as f:
+                hashes.frombytes(f.read())
+            self.history.update(hashes)
+        except (OSError, ValueError):
+            # No usable cache: start over from the ledger and workbooks
+            manifest = {"ledger_id": 0, "files": {}}
+        return manifest
+
+    def _add_history(self, keys):
+        """Add keys to the history set and append new ones to the on-disk cache."""
+        with self._lock:
+            new = array("Q", (key for key in set(keys) if key not in self.history))
+            if not new:
+                return
+            self.history.update(new)
+            try:
+                with open(self.cache_path, "ab") as f:
+                    f.write(new.tobytes())
+            except OSError as e:
+                print(f"Error saving duplicate history: {e}")
+
+    def _load_ledger(self, manifest):
+        if self.ledger is None or not os.path.exists(self.ledger.path):
+            return False
+        cols = sorted({col for _, key_cols in DUPLICATE_KEYS for col in key_cols})
+        conn = sqlite3.connect(self.ledger.path, timeout=10)
+        try:
+            existing = {row[1] for row in conn.execute("PRAGMA table_info(lots)")}
+            if not set(cols) <= existing:
+                return False
+            query = "SELECT id, " + ", ".join('"' + col + '"' for col in cols) + \
+                    " FROM lots WHERE id > ? ORDER BY id"
+            last_id, keys = manifest["ledger_id"], []
+            for row in conn.execute(query, (manifest["ledger_id"],)):
+                last_id = row[0]
+                values = dict(zip(cols, row[1:]))
+                keys.extend(key for _, key in key_hashes(values.get))
+        finally:
+            conn.close()
+        self._add_history(keys)
+        changed = last_id != manifest["ledger_id"]
+        manifest["ledger_id"] = last_id
+        return changed
+
+    def _load_exports(self, manifest):
+        """Read workbooks in the exports folder that are new or changed since the last run."""
+        if not os.path.isdir(self.export_folder):
+            return False
+        changed = False
+        for name in sorted(os.listdir(self.export_folder)):
+            if not name.lower().endswith(".xlsx") or name.startswith("~$"):
+                continue
+            path = os.path.join(self.export_folder, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            stamp = [st.st_mtime_ns, st.st_size]
+            if manifest["files"].get(name) == stamp:
+                continue
+            try:
+                self._add_history(self._workbook_keys(path))
+            except Exception as e:
+                print(f"Skipping {name} for duplicate checks: {e}")
+                continue
+            manifest["files"][name] = stamp
+            changed = True
+        return changed
+
+    def _workbook_keys(self, path):
+        wb = openpyxl.load_workbook(path, read_only=True, data_only=False)
+        try:
+            rows = wb.active.iter_rows(values_only=True)
+            header = next(rows, None) or ()
+            col_index = {str(name).strip(): idx for idx, name in enumerate(header) if name is not None}
+            keys = []
+            for row in rows:
+                keys.extend(key for _, key in key_hashes(
+                    lambda col: row[col_index[col]] if col in col_index and col_index[col] < len(row) else None))
+            return keys
+        finally:
+            wb.close()
@@ -0,0 +1,402 @@
+# entry_batch.py
+from itertools import islice
+import numpy as np
+from column_schema import ColumnSchema
+from row_store import RowStore
+from formula_engine import ROW_INPUT
+from formula_store import load_formulas, get_formula_graph
+from formula_batch import evaluate_batch, error_value
+from validation import RowValidator
+from aggregation import RunningTotals
+from duplicates import DuplicateIndex
+from suggestion_store import SUGGESTION_FILES, suggestion_registry
+from bulk_import import BulkImportJob, FileRows, find_import_files
+from excel_handler import ExportJob, FORMULAS, default_export_path
+from partitioned_export import PartitionedExportJob
+
+# Imported rows added per step of import_steps()
+IMPORT_CHUNK = 200
+
+# Rows read and added per step of load_steps(); reading a workbook row costs several times adding it
+LOAD_CHUNK = 50
+
+
+class EntryBatch:
+    """
+    The current batch of lots and everything kept in step with it, without any
+    widgets: the rows (a RowStore), their formula columns, validation results,
+    duplicate keys, running totals, crash journal and suggestions, plus import
+    and export. The Tk window (gui.py) is one client; a script or a nightly
+    job on a machine without a display can drive the same methods.
+
+    Inputs are {column: value}, text being parsed as typed in an entry box;
+    rows are addressed by store index, as in RowStore. The ledger, monthly
+    workbooks and journal are optional; with a journal, call restore() before
+    anything else, as it reopens the journal for this session.
+    """
+
+    def __init__(self, schema=None, ledger=None, monthly=None, journal=None, duplicates=None,
+                 suggestions=suggestion_registry):
+        self.schema = schema or ColumnSchema()
+        self.columns = self.schema.columns
+        self.store = RowStore(self.columns, numeric_columns=self.schema.numeric_columns)
+        self.ledger = ledger
+        self.monthly = monthly
+        self.journal = journal
+        self.duplicates = duplicates if duplicates is not None else DuplicateIndex(ledger)
+        self.validator = RowValidator(self.columns)
+        self.totals = RunningTotals(self.columns)
+        self.suggestions = suggestions
+
+    def __len__(self):
+        return len(self.store)
+
+    def formulas_loaded(self):
+        """True if formulas.json could be read (formula columns stay blank otherwise)."""
+        try:
+            return bool(load_formulas())
+        except Exception as e:
+            print(f"Critical error loading formulas: {str(e)}")
+            return False
+
+    # --- Adding and editing rows ---
+
+    def parse(self, inputs):
+        """Typed values of the global and row inputs from {column: text}; missing ones are blank."""
+        return {
+            col: self.schema.parse(col, inputs.get(col, ""))
+            for col in self.schema.global_columns + self.schema.row_columns
+        }
+
+    def check_duplicates(self, values, ignore_row=None):
+        """Why ``values`` ({column: value}) may repeat a lot of this batch or one submitted before."""
+        return self.duplicates.check(values.get, ignore_row=ignore_row)
+
+    def add(self, values):
+        """
+        Add a row from parsed inputs (see parse()) with its formula columns computed.
+        :return: the new row's id
+        """
+        row_data = dict(values)
+        # Row 1 of the exported sheet is the header
+        results = get_formula_graph().evaluate(row_data, len(self.store) + 2)
+        for col in self.schema.formula_columns:
+            row_data[col] = results.get(col, "")
+        row = self.schema.record(row_data)
+
+        row_id = self.store.append(row)
+        if self.journal:
+            self.journal.log_add(row_id, row)
+        self.duplicates.add_row(row_id, row_data.get)
+        self.validator.check_row(row_id, row)
+        self.totals.add(row)
+        for field in SUGGESTION_FILES:
+            self.suggestions.record(field, str(row_data.get(field, "")).strip())
+        return row_id
+
+    def edited_row(self, index, changes):
+        """The row at ``index`` with ``changes`` ({column: text}) parsed in; the store is not touched."""
+        values = self.store.get_row(index)
+        for col, text in changes.items():
+            values[self.schema.offsets[col]] = self.schema.parse(col, text)
+        return values
+
+    def set_row(self, index, values, changed):
+        """Store an edited row, recomputing only the formula columns downstream of ``changed``."""
+        offsets = self.schema.offsets
+        row_id = self.store.row_id(index)
+        self.suggestions.merge({
+            col: [str(values[offsets[col]]).strip()] for col in changed if col in SUGGESTION_FILES
+        })
+        self.recompute_row(values, index + 2, changed)
+        self.totals.replace(self.store.get_row(index), values)
+        self.store.set_row(index, values)
+        if self.journal:
+            self.journal.log_set(row_id, values)
+        self.duplicates.remove_row(row_id)
+        self.duplicates.add_row(row_id, dict(zip(self.columns, values)).get)
+        self.validator.check_row(row_id, values)
+
+    def remove(self, indexes):
+        """Delete rows by store index and renumber the rows that moved up."""
+        if not indexes:
+            return
+        row_ids = [self.store.row_id(index) for index in indexes]
+        if self.journal:
+            self.journal.log_delete(row_ids)
+        for row_id in row_ids:
+            self.duplicates.remove_row(row_id)
+            self.validator.forget(row_id)
+        for index in indexes:
+            self.totals.remove(self.store.get_row(index))
+        self.store.delete(indexes)
+        self.renumber(min(indexes))
+
+    def clear(self):
+        """Remove every row of the batch."""
+        if self.journal:
+            self.journal.log_clear()
+        self.store.clear()
+        self.reindex()
+
+    def restore(self):
+        """
+        Reload the rows left by the previous session from the journal, then start a fresh one.
+        :return: (rows recovered, OSError if the journal could not be reopened, else None)
+        """
+        if not self.journal:
+            return 0, None
+        rows = self.journal.replay()
+        self.store.extend(rows)
+        self.reindex()
+        error = None
+        try:
+            self.journal.open((self.store.row_id(index), self.store.get_row(index))
+                              for index in range(len(self.store)))
+        except OSError as e:
+            print(f"Error opening batch journal: {e}")
+            error = e
+        if rows:
+            # ROW() based and other formula columns are recomputed with the current formulas
+            self.reprice_all()
+        return len(rows), error
+
+    def reindex(self):
+        """Rebuild the duplicate keys, validation results and totals of every row in the store."""
+        self.duplicates.rebuild_batch(self.store)
+        self.validator.rebuild(self.store)
+        self.totals.reset(self.store)
+
+    # --- Formula columns ---
+
+    def renumber(self, first_index):
+        """Rows from ``first_index`` on moved; refresh ROW() based columns (MRN No.)"""
+        changed = get_formula_graph().downstream([ROW_INPUT])
+        if not changed or first_index >= len(self.store):
+            return
+        self.compute(first_index, len(self.store), changed)
+        if set(changed) & set(self.totals.measures):
+            self.totals.reset(self.store)  # a totalled column depends on the row number
+
+    def compute(self, start, stop, columns=None):
+        """
+        Recompute formula columns of the rows ``start`` to ``stop`` with one
+        evaluate_batch() call and write them back column by column.
+        :param columns: formula columns to store; None stores all of them
+        """
+        graph = get_formula_graph()
+        inputs = {col: self._formula_input(col, start, stop)
+                  for col in graph.inputs if col in self.store.col_index}
+        # Row 1 of the exported sheet is the header
+        results = evaluate_batch(graph, inputs, stop - start, row_numbers=range(start + 2, stop + 2))
+        numeric = set(self.schema.numeric_columns)
+        for col in results if columns is None else columns:
+            if col not in self.store.col_index or col not in results:
+                continue
+            values, errors = results[col]
+            if col in numeric:
+                failed = {start + int(idx): error_value(int(errors[idx])) for idx in np.flatnonzero(errors)}
+                self.store.set_numbers(col, values, start, failed)
+            else:
+                self.store.set_column(col, [
+                    error_value(int(code)) if code else float(value)
+                    for value, code in zip(values, errors)
+                ], start)
+
+    def recompute_row(self, row_values, row_number, changed):
+        """
+        Recompute the formula columns affected by ``changed`` inputs, in place.
+        Returns True if any value was updated.
+        """
+        graph = get_formula_graph()
+        if not graph.downstream(changed):
+            return False
+        row_data = dict(zip(self.columns, row_values))
+        results = graph.evaluate(row_data, row_number, changed)
+        offsets = self.schema.offsets
+        for col, value in results.items():
+            if col in offsets:
+                row_values[offsets[col]] = value
+        return True
+
+    def _formula_input(self, col, start, stop):
+        numbers = self.store.column_numbers(col, start, stop)
+        if numbers is None:
+            return self.store.column_values(col, start, stop)
+        # Blank cells count as 0, as in formula_engine.to_number
+        return np.nan_to_num(np.frombuffer(numbers, dtype=np.float64), nan=0.0)
+
+    def reprice_all(self):
+        """Recompute the formula columns of every row at once, e.g. after the formulas change."""
+        if not len(self.store):
+            return False
+        self.compute(0, len(self.store))
+        self.totals.reset(self.store)
+        return True
+
+    # --- Checking ---
+
+    def problems(self):
+        """Validation messages ("Row n: ...") of every row, in row order."""
+        return self.validator.report(self.store.row_ids())
+
+    # --- Import ---
+
+    def import_job(self, paths, workers=None):
+        """A BulkImportJob (not started) for ``paths`` that skips lots already in the batch."""
+        return BulkImportJob(paths, self.schema, existing_rows=self.store.snapshot(),
+                             suggestion_fields=list(SUGGESTION_FILES), workers=workers)
+
+    def add_rows(self, rows):
+        """
+        Append rows of input values in column order (e.g. from an import). Their
+        formula columns are computed together, and only the new rows are validated,
+        indexed for duplicates, totalled and journaled.
+        :return: number of rows added
+        """
+        first = len(self.store)
+        self.store.extend(rows)
+        stop = len(self.store)
+        if stop == first:
+            return 0
+        self.compute(first, stop)
+        added = []
+        for index in range(first, stop):
+            row_id = self.store.row_id(index)
+            values = self.store.get_row(index)
+            self.duplicates.add_row(row_id, dict(zip(self.columns, values)).get)
+            self.validator.check_row(row_id, values)
+            self.totals.add(values)
+            added.append((row_id, values))
+        if self.journal:
+            self.journal.log_adds(added)
+        return stop - first
+
+    def import_steps(self, job, chunk=IMPORT_CHUNK):
+        """
+        Add the rows of a finished BulkImportJob ``chunk`` rows at a time, yielding
+        the number added so far, so a window can stay responsive in between.
+        Closing it early keeps the rows added so far; the job's suggestions are
+        kept once every row is in.
+        """
+        added = 0
+        for start in range(0, len(job.rows), chunk):
+            added += self.add_rows(job.rows[start:start + chunk])
+            yield added
+        self.suggestions.merge(job.suggestions)
+
+    def add_imported(self, job):
+        """Add every row of a finished BulkImportJob (see import_steps)."""
+        for _ in self.import_steps(job):
+            pass
+        return len(job.rows)
+
+    def open_file(self, path):
+        """A FileRows reader over one workbook or CSV file, for load_steps()."""
+        return FileRows(path, self.schema, SUGGESTION_FILES)
+
+    def load_steps(self, reader, chunk=LOAD_CHUNK):
+        """
+        Replace the batch with the rows of ``reader`` (see open_file()), reading and
+        adding ``chunk`` rows at a time; yields the number loaded so far. Closing it
+        early keeps the rows loaded so far. When it ends the file is closed and the
+        suggestions seen in the rows read are kept.
+        """
+        self.clear()
+        rows = iter(reader)
+        loaded = 0
+        try:
+            while True:
+                block = list(islice(rows, chunk))
+                if not block:
+                    break
+                loaded += self.add_rows(block)
+                yield loaded
+        finally:
+            reader.close()
+            self.suggestions.merge(reader.suggestions)
+
+    def load_file(self, path):
+        """Replace the batch with the rows of one workbook or CSV file; returns the number of rows."""
+        loaded = 0
+        for loaded in self.load_steps(self.open_file(path)):
+            pass
+        return loaded
+
+    def import_folder(self, folder, workers=None):
+        """Import every workbook and CSV file in ``folder``; returns the finished job (see ``failed``)."""
+        job = self.import_job(find_import_files(folder), workers).start().wait()
+        if job.error is not None:
+            raise job.error
+        self.add_imported(job)
+        return job
+
+    # --- Export ---
+
+    def export_job(self, filepath=None, summary=False, mode=FORMULAS):
+        """
+        An ExportJob (not started) for a snapshot of the batch. Once it is done,
+        pass it to submitted() with the row ids it was given.
+        :return: (job, row ids of the exported rows)
+        """
+        rows = self.store.snapshot()
+        job = ExportJob(self.columns, rows, filepath or default_export_path(),
+                        ledger=self.ledger, summary=summary, mode=mode, monthly=self.monthly)
+        return job, rows.row_ids()
+
+    def submitted(self, job, row_ids):
+        """A batch was saved: remember its keys as submitted and drop its rows (lots added since stay)."""
+        self.duplicates.submitted_store(job.rows)  # the snapshot from export_job()
+        remaining = self.store.indexes_of(row_ids)
+        if remaining:
+            self.remove(remaining)
+        if self.monthly is not None:
+            self.monthly.merge_async()
+
+    def submit(self, filepath=None, summary=False, mode=FORMULAS):
+        """Export the batch, record it and clear it, waiting for the file; returns the finished job."""
+        job, row_ids = self.export_job(filepath, summary, mode)
+        job.start().wait()
+        if job.error is not None:
+            raise job.error
+        self.submitted(job, row_ids)
+        return job
+
+    def split_export_job(self, key, folder=None, mode=FORMULAS):
+        """A PartitionedExportJob (not started) writing one workbook per ``key`` value."""
+        return PartitionedExportJob(self.columns, self.store.snapshot(), key,
+                                    folder=folder, mode=mode)
+
+
+# --- Without a window: python entry_batch.py <folder> [output.xlsx] ---
+
+def process_folder(folder, filepath=None, summary=True, mode=FORMULAS):
+    """Import every file in ``folder`` as one batch and submit it (ledger and monthly workbook included)."""
+    from ledger import Ledger
+    from monthly_workbook import MonthlyWorkbooks
+    schema = ColumnSchema()
+    monthly = MonthlyWorkbooks(schema.columns)
+    batch = EntryBatch(schema, ledger=Ledger(schema.columns), monthly=monthly)
+    batch.duplicates.load_history()
+    job = batch.import_folder(folder)
+    for path, error in job.failed:
+        print(f"Could not read {path}: {error}")
+    problems = batch.problems()
+    for line in problems:
+        print(line)
+    export = batch.submit(filepath, summary=summary, mode=mode)
+    monthly.merge_async()
+    monthly.wait()
+    print(f"Imported {len(job.rows)} rows ({job.duplicates} repeated, {len(problems)} problems); "
+          f"saved to {export.filepath}")
+    return export
+
+
+if __name__ == "__main__":
+    import multiprocessing
+    import sys
+    multiprocessing.freeze_support()
+    if len(sys.argv) < 2:
+        print("usage: python entry_batch.py <folder> [output.xlsx]")
+        sys.exit(1)
+    process_folder(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)
@@ -1,146 +1,552 @@
-# excel_handler.py
-import os
-import json
-from datetime import datetime
-from openpyxl import Workbook
-from openpyxl.styles import Alignment, Font
-from tkinter import filedialog, messagebox
-from path_utils import get_resource_path, ensure_dir
-
-FORMULA_FILE = get_resource_path("formulas.json")
-EXPORT_FOLDER = get_resource_path("exports")
-
-
-def load_formulas():
-    """Load formulas from formulas.json."""
-    if os.path.exists(FORMULA_FILE):
-        with open(FORMULA_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return {}
-
-
-def ensure_export_folder():
-    """Ensure the export folder exists."""
-    if not os.path.exists(EXPORT_FOLDER):
-        os.makedirs(EXPORT_FOLDER)
-
-
-def export_to_excel(columns, data, ask_filename=True):
-    """
-    Export TreeView data to Excel with formulas and formatting.
-    :param columns: list of column names
-    :param data: list of row values (from TreeView)
-    :param ask_filename: if True, open Save As dialog
-    """
-    ensure_export_folder()
-    formulas = load_formulas()
-
-    # Create workbook
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Data"
-
-    # --- Write Headers ---
-    for col_idx, col_name in enumerate(columns, start=1):
-        cell = ws.cell(row=1, column=col_idx, value=col_name)
-        cell.font = Font(bold=True)
-        cell.alignment = Alignment(horizontal="center")
-
-    # --- Write Data ---
-    for row_idx, row_values in enumerate(data, start=2):
-        for col_idx, value in enumerate(row_values, start=1):
-            col_name = columns[col_idx - 1]
-
-            if col_name in formulas and formulas[col_name].get("formula"):
-                # Write formula using Excel column letters
-                excel_formula = convert_formula(formulas[col_name]["formula"], columns, row_idx)
-                cell = ws.cell(row=row_idx, column=col_idx)
-                if value == "📝 Formula":  # If it's our formula placeholder
-                    cell.value = excel_formula
-                    if excel_formula.startswith("="):
-                        cell.number_format = '#,##0.00'
-                else:
-                    cell.value = value  # Keep the actual value
-            else:
-                cell = ws.cell(row=row_idx, column=col_idx)
-                try:
-                    # Try to convert numeric strings to actual numbers
-                    if isinstance(value, str) and value.replace(".", "").replace(",", "").isdigit():
-                        cell.value = float(value.replace(",", ""))
-                        cell.number_format = '#,##0.00'
-                    else:
-                        cell.value = value
-                except (ValueError, AttributeError):
-                    cell.value = value
-
-    # --- Adjust column widths ---
-    for col_idx, col_name in enumerate(columns, start=1):
-        excel_col = get_excel_column_name(col_idx)
-        ws.column_dimensions[excel_col].width = max(15, len(col_name) + 2)
-
-    # --- Choose filename ---
-    filepath = None
-    if ask_filename:
-        filepath = filedialog.asksaveasfilename(
-            defaultextension=".xlsx",
-            filetypes=[("Excel Files", "*.xlsx")],
-            initialdir=EXPORT_FOLDER,
-            title="Save Excel File"
-        )
-
-    if not filepath:  # if dialog cancelled
-        filename = datetime.now().strftime("%Y%m%d_%H%M%S.xlsx")
-        filepath = os.path.join(EXPORT_FOLDER, filename)
-    print(f"Row {row_idx}, Col {col_name}: {excel_formula if col_name in formulas else value}")
-
-    wb.save(filepath)
-
-    # Success popup
-    messagebox.showinfo("Export Successful", f"Data exported to:\n{filepath}")
-    return filepath
-
-
-def convert_formula(named_formula, columns, row_idx):
-    """
-    Convert a column-name formula (e.g. =[Bill Wt (Qtl)] * [Basic Rate as per Bill])
-    into an Excel-style formula with cell references.
-    """
-    if not named_formula:
-        return ""
-
-    # Special case for MRN No.
-    if named_formula.strip().upper() == "=ROW()-1":
-        return "=ROW()-1"
-
-    # Start with the original formula
-    excel_formula = named_formula
-
-    # Replace [Column Name] with Excel cell references
-    for col_name in columns:
-        if f"[{col_name}]" in excel_formula:
-            col_idx = columns.index(col_name) + 1  # 1-based index
-            excel_col = get_excel_column_name(col_idx)
-            excel_formula = excel_formula.replace(f"[{col_name}]", f"{excel_col}{row_idx}")
-
-    # Ensure it starts with "="
-    if not excel_formula.strip().startswith("="):
-        excel_formula = "=" + excel_formula
-
-    # Replace ROUND function if present
-    if "ROUND(" in excel_formula:
-        excel_formula = excel_formula.replace("ROUND(", "ROUND(")
-
-    return excel_formula
-
-
-
-def get_excel_column_name(n):
-    """
-    Convert a 1-based column index into Excel-style column letters.
-    Example: 1 -> A, 27 -> AA
-    """
-    result = ""
-    while n > 0:
-        n, remainder = divmod(n - 1, 26)
-        result = chr(65 + remainder) + result
-    return result
+# excel_handler.py
+import os
+import re
+import threading
+import zipfile
+from copy import copy
+from datetime import datetime
+from functools import lru_cache
+from itertools import islice
+import numpy as np
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Font, NamedStyle
+from path_utils import get_resource_path
+from formula_store import formula_store
+from aggregation import GroupTotals, SUMMARY_GROUPS
+from formula_engine import formula_graph
+from formula_batch import evaluate_batch, error_value
+
+EXPORT_FOLDER = get_resource_path("exports")
+
+# Rows between progress callbacks / cancellation checks
+PROGRESS_EVERY = 500
+
+_COLUMN_REF = re.compile(r"\[([^\]]+)\]")
+
+# What formula columns hold in an export: the formulas (Excel computes them on
+# open), their values as computed here, or the formulas with those values cached
+FORMULAS, VALUES, FORMULAS_AND_VALUES = "formulas", "values", "both"
+EXPORT_MODES = {FORMULAS: "Formulas", VALUES: "Values only", FORMULAS_AND_VALUES: "Formulas and values"}
+
+# Rows evaluated together when an export includes computed values
+VALUE_CHUNK = 5000
+
+# An empty formula cell as openpyxl writes it, to fill in the cached value
+_EMPTY_FORMULA_CELL = re.compile(rb'<c r="([A-Z]+)([0-9]+)"([^>]*)><f>([^<]*)</f><v></v></c>')
+
+# Named cell styles, registered once per workbook instead of styling each cell
+HEADER_STYLE = "Data Header"
+NUMBER_STYLE = "Data Number"
+
+
+def add_named_styles(wb):
+    """Register the export's named styles on a workbook."""
+    wb.add_named_style(NamedStyle(name=HEADER_STYLE, font=Font(bold=True), alignment=Alignment(horizontal="center")))
+    wb.add_named_style(NamedStyle(name=NUMBER_STYLE, number_format="#,##0.00"))
+
+
+def load_formulas():
+    """Load formulas from formulas.json (shared cached copy)."""
+    return formula_store.formulas()
+
+
+def ensure_export_folder():
+    """Ensure the export folder exists."""
+    if not os.path.exists(EXPORT_FOLDER):
+        os.makedirs(EXPORT_FOLDER)
+
+
+def default_export_path():
+    """A timestamped file in exports/, e.g. exports/20240131_183000.xlsx"""
+    ensure_export_folder()
+    return os.path.join(EXPORT_FOLDER, datetime.now().strftime("%Y%m%d_%H%M%S.xlsx"))
+
+
+def choose_export_path(ask_filename=True):
+    """Ask where to save (if requested); fall back to a timestamped file in exports/."""
+    # Tk is imported only by the dialogs, so the rest of this module runs without a display
+    from tkinter import filedialog
+    ensure_export_folder()
+    filepath = None
+    if ask_filename:
+        filepath = filedialog.asksaveasfilename(
+            defaultextension=".xlsx",
+            filetypes=[("Excel Files", "*.xlsx")],
+            initialdir=EXPORT_FOLDER,
+            title="Save Excel File"
+        )
+
+    if not filepath:  # if dialog cancelled
+        filepath = default_export_path()
+    return filepath
+
+
+def export_to_excel(columns, data, ask_filename=True, summary=False, mode=FORMULAS):
+    """
+    Export TreeView data to Excel with formulas and formatting.
+    :param columns: list of column names
+    :param data: iterable of row values (from TreeView); a generator is fine,
+                 rows are streamed to disk as they are consumed
+    :param ask_filename: if True, open Save As dialog
+    :param summary: if True, add sheets of totals by Party Name, Agent, Mkt Committee and City
+    :param mode: FORMULAS, VALUES or FORMULAS_AND_VALUES (see EXPORT_MODES)
+    """
+    from tkinter import messagebox
+
+    # --- Choose filename ---
+    filepath = choose_export_path(ask_filename)
+
+    row_count = write_workbook(filepath, columns, data,
+                               summary_groups=SUMMARY_GROUPS if summary else None, mode=mode)
+    print(f"Exported {row_count} rows to {filepath}")
+
+    # Success popup
+    messagebox.showinfo("Export Successful", f"Data exported to:\n{filepath}")
+    return filepath
+
+
+class ExportCancelled(Exception):
+    """Raised inside write_workbook() when the export is cancelled."""
+
+
+def write_workbook(filepath, columns, data, formulas=None, progress=None, cancel_event=None,
+                   summary_groups=None, mode=FORMULAS):
+    """
+    Stream rows into a new workbook using openpyxl's write-only mode, so memory
+    stays flat however many rows are written.
+
+    The workbook is written to a temporary file, flushed to disk and renamed over
+    ``filepath``, so a crash or cancel never leaves a half-written file behind.
+    :param data: iterable of row values in ``columns`` order
+    :param formulas: formulas.json mapping; defaults to the shared copy
+    :param progress: optional callback receiving the number of rows written so far
+    :param cancel_event: optional threading.Event; when set, ExportCancelled is raised
+    :param summary_groups: optional columns to total by; each gets a summary sheet,
+                           aggregated while the rows stream past
+    :param mode: FORMULAS writes formula columns as formulas; VALUES writes the values
+                 formula_engine computes for them; FORMULAS_AND_VALUES writes the formulas
+                 with those values cached, so readers that do not recalculate still see them
+    :return: number of data rows written
+    """
+    if formulas is None:
+        formulas = load_formulas()
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Data")
+    add_named_styles(wb)
+    if mode != FORMULAS:
+        wb.calculation.fullCalcOnLoad = False  # the values are already there
+
+    # --- Adjust column widths (write-only sheets need them before any row) ---
+    for col_idx, col_name in enumerate(columns, start=1):
+        excel_col = get_excel_column_name(col_idx)
+        ws.column_dimensions[excel_col].width = max(15, len(col_name) + 2)
+
+    # --- Write Headers ---
+    ws.append([_styled_cell(ws, col_name, HEADER_STYLE) for col_name in columns])
+    number_style = _styled_cell(ws, None, NUMBER_STYLE)._style
+
+    # Resolve [Column] references once per export; each row only fills in its number
+    templates = formula_templates(formulas, columns)
+    formula_slots = [templates.get(col_name) for col_name in columns]
+    totals = GroupTotals(columns, summary_groups) if summary_groups else None
+
+    # Formula results, per formula column, for the rows of the current chunk
+    if mode == FORMULAS:
+        chunks = ((data, None),)
+    else:
+        chunks = _computed_chunks(data, formula_graph(formulas), columns)
+    cached = {}  # FORMULAS_AND_VALUES: column letter -> [(values, errors) per chunk]
+
+    # --- Write Data ---
+    row_count = 0
+    row_idx = 1
+    for chunk, results in chunks:
+        computed = [results.get(col) if results is not None else None for col in columns]
+        if mode == FORMULAS_AND_VALUES:
+            for col_idx, (template, result) in enumerate(zip(formula_slots, computed), start=1):
+                if template is not None and result is not None:
+                    cached.setdefault(get_excel_column_name(col_idx), []).append(result)
+        for chunk_idx, row_values in enumerate(chunk):
+            row_idx += 1
+            if totals is not None:
+                totals.add_row(row_values)
+            row_number = str(row_idx)
+            cells = []
+            for template, result, value in zip(formula_slots, computed, row_values):
+                if template is not None and (mode != VALUES or result is None):
+                    # Write formula using Excel column letters; the value shown in the
+                    # TreeView is only a preview computed by formula_engine
+                    # (FORMULAS_AND_VALUES caches the computed value once the file is saved)
+                    cells.append(_cell_like(ws, row_number.join(template), number_style))
+                elif template is not None:
+                    code = result[1][chunk_idx]
+                    computed_value = error_value(int(code)) if code else float(result[0][chunk_idx])
+                    cells.append(_cell_like(ws, computed_value, number_style))
+                elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                    # The row store already holds numeric inputs as numbers
+                    cells.append(_cell_like(ws, value, number_style))
+                elif isinstance(value, str) and value.replace(".", "").replace(",", "").isdigit():
+                    # Convert numeric strings to actual numbers
+                    try:
+                        cells.append(_cell_like(ws, float(value.replace(",", "")), number_style))
+                    except ValueError:
+                        cells.append(value)
+                else:
+                    cells.append(value)
+            ws.append(cells)
+            row_count += 1
+
+            if row_count % PROGRESS_EVERY == 0:
+                _check_cancelled(ws, cancel_event)
+                if progress:
+                    progress(row_count)
+
+    _check_cancelled(ws, cancel_event)
+    if totals is not None:
+        add_summary_sheets(wb, totals.results(), totals.measures)
+    finish = None
+    if cached:
+        finish = lambda path: _add_cached_values(path, {
+            letter: (np.concatenate([v for v, _ in parts]), np.concatenate([e for _, e in parts]))
+            for letter, parts in cached.items()
+        })
+    save_durably(wb, filepath, finish=finish)
+    if progress:
+        progress(row_count)
+    return row_count
+
+
+def add_summary_sheets(wb, summaries, measures):
+    """
+    One sheet per grouping ("By Party Name", ...) with lots and totals per group,
+    written as values so nothing has to be recalculated when the file opens.
+    :param summaries: {group column: [(name, lots, total, ...), ...]} from aggregation.GroupTotals
+    """
+    for group, rows in summaries.items():
+        ws = wb.create_sheet(f"By {group}"[:31])
+        header = [group, "Lots"] + list(measures)
+        for col_idx, col_name in enumerate(header, start=1):
+            ws.column_dimensions[get_excel_column_name(col_idx)].width = max(15, len(col_name) + 2)
+        ws.append([_styled_cell(ws, col_name, HEADER_STYLE) for col_name in header])
+        number_style = _styled_cell(ws, None, NUMBER_STYLE)._style
+
+        grand = [0] * (len(header) - 1)
+        for name, *values in rows:
+            ws.append([name] + [values[0]] + [_cell_like(ws, value, number_style) for value in values[1:]])
+            grand = [total + value for total, value in zip(grand, values)]
+        ws.append([_styled_cell(ws, "Total", HEADER_STYLE), grand[0]]
+                  + [_cell_like(ws, value, number_style) for value in grand[1:]])
+
+
+def write_summary_workbook(filepath, summaries, measures):
+    """A workbook of summary sheets only (e.g. totals over the ledger)."""
+    wb = Workbook(write_only=True)
+    add_named_styles(wb)
+    add_summary_sheets(wb, summaries, measures)
+    save_durably(wb, filepath)
+
+
+def _computed_chunks(data, graph, columns):
+    """
+    Yield (rows, formula results) VALUE_CHUNK rows at a time; the results are
+    evaluate_batch() output for those rows, numbered as they appear in the sheet.
+    """
+    rows = iter(data)
+    first_row = 2
+    while True:
+        chunk = list(islice(rows, VALUE_CHUNK))
+        if not chunk:
+            return
+        values = {
+            col: [row[idx] if idx < len(row) else "" for row in chunk]
+            for idx, col in enumerate(columns)
+        }
+        row_numbers = np.arange(first_row, first_row + len(chunk), dtype=np.float64)
+        yield chunk, evaluate_batch(graph, values, len(chunk), row_numbers)
+        first_row += len(chunk)
+
+
+def _add_cached_values(path, cached, sheet="xl/worksheets/sheet1.xml"):
+    """
+    Rewrite a saved workbook so the formula cells of ``sheet`` carry their values.
+    openpyxl can only write formulas; the sheet XML is streamed through once,
+    filling each empty <v></v> after a formula.
+    :param cached: {column letter: (values, error codes)} indexed by sheet row - 2
+    """
+    def fill(match):
+        letter, row, attrs, formula = match.groups()
+        result = cached.get(letter.decode())
+        index = int(row) - 2
+        if result is None or not 0 <= index < len(result[0]):
+            return match.group(0)
+        code = int(result[1][index])
+        if code:
+            attrs += b' t="e"'
+            value = error_value(code).encode()
+        else:
+            value = repr(float(result[0][index])).encode()
+        return b'<c r="' + letter + row + b'"' + attrs + b"><f>" + formula + b"</f><v>" + value + b"</v></c>"
+
+    temp_path = path + ".values"
+    try:
+        with zipfile.ZipFile(path) as src, \
+                zipfile.ZipFile(temp_path, "w", zipfile.ZIP_DEFLATED) as dst:
+            for item in src.infolist():
+                if item.filename != sheet:
+                    dst.writestr(item, src.read(item.filename))
+                    continue
+                with src.open(item) as fin, dst.open(item.filename, "w", force_zip64=True) as fout:
+                    pending = b""
+                    while True:
+                        block = fin.read(1 << 20)
+                        pending += block
+                        # Only whole cells are rewritten; a cell cut by the block end waits
+                        cut = len(pending) if not block else pending.rfind(b"</c>") + 4
+                        if cut >= 4:
+                            fout.write(_EMPTY_FORMULA_CELL.sub(fill, pending[:cut]))
+                            pending = pending[cut:]
+                        if not block:
+                            break
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def _check_cancelled(ws, cancel_event):
+    if cancel_event is not None and cancel_event.is_set():
+        ws.close()  # finish the sheet's temp stream cleanly before abandoning it
+        raise ExportCancelled()
+
+
+def save_durably(wb, filepath, finish=None):
+    """
+    Save via a temp file + fsync + rename, so ``filepath`` is either complete or untouched.
+    :param finish: optional callback given the temp file's path after saving, to amend it
+    """
+    temp_path = filepath + ".tmp"
+    try:
+        wb.save(temp_path)
+        if finish:
+            finish(temp_path)
+        with open(temp_path, "rb+") as f:
+            os.fsync(f.fileno())
+        os.replace(temp_path, filepath)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+class ExportJob:
+    """
+    Runs write_workbook() on a worker thread so the window stays usable.
+    The Tk side polls ``written``/``done`` with after(); nothing here touches widgets.
+    """
+
+    def __init__(self, columns, rows, filepath, ledger=None, summary=False, mode=FORMULAS, monthly=None):
+        self.columns = list(columns)
+        self.mode = mode  # see EXPORT_MODES
+        self.summary = summary  # add totals sheets by party, agent, committee and city
+        self.rows = rows  # list of rows, or a RowStore.snapshot() taken on the Tk thread
+        self.filepath = filepath
+        self.ledger = ledger  # optional ledger.Ledger; the saved rows are recorded there too
+        self.ledger_error = None
+        self.monthly = monthly  # optional monthly_workbook.MonthlyWorkbooks; the batch is appended as shards
+        self.monthly_error = None
+        self.total = len(rows)
+        self.written = 0
+        self.done = False
+        self.cancelled = False
+        self.error = None
+        self._cancel_event = threading.Event()
+        # Not a daemon: closing the window still lets a running export finish
+        self._thread = threading.Thread(target=self._run, name="excel-export")
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def wait(self):
+        """Block until the export has finished (for callers without an event loop)."""
+        self._thread.join()
+        return self
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    def _progress(self, written):
+        self.written = written
+
+    def _run(self):
+        try:
+            write_workbook(self.filepath, self.columns, self.rows,
+                           progress=self._progress, cancel_event=self._cancel_event,
+                           summary_groups=SUMMARY_GROUPS if self.summary else None,
+                           mode=self.mode)
+            if self.ledger is not None:
+                try:
+                    self.ledger.record_batch(self.rows, self.filepath)
+                except Exception as e:
+                    # The workbook is saved; a ledger problem must not make the batch look unsaved
+                    print(f"Error recording batch in ledger: {e}")
+                    self.ledger_error = e
+            if self.monthly is not None:
+                try:
+                    self.monthly.append_batch(self.rows)
+                except Exception as e:
+                    # Likewise: the batch is saved, only the monthly workbook is behind
+                    print(f"Error adding batch to monthly workbook: {e}")
+                    self.monthly_error = e
+        except ExportCancelled:
+            self.cancelled = True
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+
+
+def _styled_cell(ws, value, style_name):
+    cell = WriteOnlyCell(ws, value=value)
+    cell.style = style_name
+    return cell
+
+
+def _cell_like(ws, value, style_array):
+    # Copying a resolved style is much cheaper than looking the named style up per cell
+    cell = WriteOnlyCell(ws, value=value)
+    cell._style = copy(style_array)
+    return cell
+
+
+def convert_formula(named_formula, columns, row_idx):
+    """
+    Convert a column-name formula (e.g. =[Bill Wt (Qtl)] * [Basic Rate as per Bill])
+    into an Excel-style formula with cell references.
+    """
+    if not named_formula:
+        return ""
+    return str(row_idx).join(formula_template(named_formula, tuple(columns)))
+
+
+@lru_cache(maxsize=512)
+def formula_template(named_formula, columns):
+    """
+    Pre-resolve a column-name formula for a column layout.
+    Returns the formula split at its row numbers, so that
+    str(row_idx).join(template) is the Excel formula for that row.
+    :param columns: tuple of column names (hashable, so templates are cached)
+    """
+    # Special case for MRN No.
+    if named_formula.strip().upper() == "=ROW()-1":
+        return ("=ROW()-1",)
+
+    letters = {name: get_excel_column_name(idx) for idx, name in enumerate(columns, start=1)}
+    parts = []
+    current = "" if named_formula.strip().startswith("=") else "="
+    pos = 0
+    # Replace [Column Name] with Excel cell references; unknown names are left as typed
+    for match in _COLUMN_REF.finditer(named_formula):
+        name = match.group(1)
+        if name not in letters:
+            continue
+        current += named_formula[pos:match.start()] + letters[name]
+        parts.append(current)
+        current = ""
+        pos = match.end()
+    parts.append(current + named_formula[pos:])
+    return tuple(parts)
+
+
+def formula_templates(formulas, columns):
+    """Build {column: template} for every column that has a formula."""
+    columns = tuple(columns)
+    return {
+        col_name: formula_template(formulas[col_name]["formula"], columns)
+        for col_name in columns
+        if col_name in formulas and formulas[col_name].get("formula")
+    }
+
+
+
+def get_excel_column_name(n):
+    """
+    Convert a 1-based column index into Excel-style column letters.
+    Example: 1 -> A, 27 -> AA
+    """
+    result = ""
+    while n > 0:
+        n, remainder = divmod(n - 1, 26)
+        result = chr(65 + remainder) + result
+    return result
+
+
+# --- Benchmark: python excel_handler.py [rows ...] ---
+
+def _benchmark_rows(count, schema):
+    """Synthetic lots, generated as they are written so the rows themselves take no memory."""
+    for i in range(count):
+        row = {col: "" for col in schema.columns}
+        row.update({
+            "Arrival Lot date": "05/01/2024", "Bill No.": f"B-{i}", "Bill Date": "04/01/2024",
+            "Agent": f"Agent {i % 7}", "Party Name": f"Party {i % 300}", "City": f"City {i % 40}",
+            "Mkt Committee": f"Committee {i % 9}", "Vehicle No.": f"PB{i:06d}", "Bags": 100,
+            "Bill Wt (Qtl)": 50.0 + i % 10, "Kanda Wt with Bardana(Qtl)": 50.5, "Other Amt": 10.0,
+            "Basic Rate as per Bill": 2500.0, "Sauda": 2450.0, "Moist(%)": 14.0, "Fungus": 1.0, "Broken": 2.0,
+        })
+        yield schema.record(row)
+
+
+def _benchmark_case(count, mode, folder):
+    """
+    Export ``count`` synthetic rows in ``mode`` (run in a fresh process, so the
+    peak memory is this export's own). Returns (seconds, peak MB, file MB).
+    """
+    import sys
+    import time
+    import tracemalloc
+    from column_schema import ColumnSchema
+    try:
+        import resource
+    except ImportError:  # Windows: fall back to Python allocations, which tracing slows down
+        resource = None
+        tracemalloc.start()
+    schema = ColumnSchema()
+    path = os.path.join(folder, f"export_{count}_{mode}.xlsx")
+    started = time.perf_counter()
+    write_workbook(path, schema.columns, _benchmark_rows(count, schema), mode=mode)
+    elapsed = time.perf_counter() - started
+    if resource is None:
+        peak_mb = tracemalloc.get_traced_memory()[1] / 2 ** 20
+    else:
+        # ru_maxrss is in kilobytes, except on macOS (bytes)
+        peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (2 ** 20 if sys.platform == "darwin" else 2 ** 10)
+    size_mb = os.path.getsize(path) / 2 ** 20
+    os.remove(path)
+    return elapsed, peak_mb, size_mb
+
+
+def benchmark_export(sizes=(10000, 100000, 500000), modes=tuple(EXPORT_MODES)):
+    """
+    Time write_workbook() and measure its peak memory for each row count and
+    export mode; returns {(rows, mode): (seconds, peak MB)}.
+    """
+    import tempfile
+    from concurrent.futures import ProcessPoolExecutor
+    results = {}
+    with tempfile.TemporaryDirectory() as folder:
+        for count in sizes:
+            for mode in modes:
+                with ProcessPoolExecutor(max_workers=1) as pool:
+                    elapsed, peak_mb, size_mb = pool.submit(_benchmark_case, count, mode, folder).result()
+                print(f"{count} rows, {EXPORT_MODES[mode]}: {elapsed:.1f}s ({elapsed * 1e6 / count:.0f} us per row), "
+                      f"peak memory {peak_mb:.0f} MB, file {size_mb:.1f} MB")
+                results[count, mode] = (elapsed, peak_mb)
+    return results
+
+if __name__ == "__main__":
+    import multiprocessing
+    import sys
+    multiprocessing.freeze_support()
+    benchmark_export([int(arg) for arg in sys.argv[1:]] or (10000, 100000, 500000))
@@ -1,124 +1,254 @@
-from tkinter import filedialog, messagebox
-import openpyxl
-from tkinter import messagebox
-from datetime import datetime
-
-
-
-# entry_viewer.py
-
-def view_data(tree, all_columns, row_entries=None):
-    """
-    Load an Excel file into the TreeView and update suggestions if row_entries are provided.
-    """
-    filepath = filedialog.askopenfilename(
-        defaultextension=".xlsx",
-        filetypes=[("Excel Files", "*.xlsx")],
-        initialdir="exports",
-        title="Open Excel File"
-    )
-
-    if not filepath:
-        return  # user cancelled
-
-    try:
-        wb = openpyxl.load_workbook(filepath, data_only=False)
-        ws = wb.active
-
-        # Clear TreeView
-        for child in tree.get_children():
-            tree.delete(child)
-
-        # Collect unique values for suggestions
-        new_suggestions = {
-            "Party Name": set(),
-            "City": set(),
-            "Agent": set(),
-            "Mkt Committee": set()
-        }
-
-        # Read rows (skip header row)
-        for row in ws.iter_rows(min_row=2, values_only=True):
-            tree.insert("", "end", values=row)
-
-            # Extract values for suggestion fields
-            for field in new_suggestions.keys():
-                try:
-                    col_index = all_columns.index(field)
-                    value = row[col_index]
-                    if value:
-                        new_suggestions[field].add(str(value))
-                except Exception:
-                    pass
-
-        # ✅ Update suggestion JSON files if row_entries are provided
-        if row_entries:
-            for field, filename in [
-                ("Party Name", "party_name_suggestions.json"),
-                ("City", "city_suggestions.json"),
-                ("Agent", "agent_suggestions.json"),
-                ("Mkt Committee", "mkt_committee_suggestions.json")
-            ]:
-                entry_widget = row_entries.get(field)
-                if hasattr(entry_widget, "update_suggestions"):
-                    merged = set(entry_widget.suggestion_list) | new_suggestions[field]
-                    entry_widget.update_suggestions(sorted(merged))
-
-        messagebox.showinfo("View Data", f"Data loaded and suggestions updated from:\n{filepath}")
-
-    except Exception as e:
-        messagebox.showerror("Error", f"Failed to load Excel file:\n{e}")
-
-
-# entry_checker.py
-
-def check_entries(tree, all_columns):
-    """Validate all TreeView entries before export."""
-    errors = []
-    required_fields = ["Bill No.", "Bill Date", "Bags", "Bill Wt (Qtl)"]
-
-    for row_idx, child in enumerate(tree.get_children(), start=1):
-        values = tree.item(child)["values"]
-
-        # Required field check
-        for field in required_fields:
-            try:
-                value = values[all_columns.index(field)]
-                if not value or str(value).strip() == "":
-                    errors.append(f"Row {row_idx}: {field} is empty")
-            except ValueError:
-                pass
-
-        # Numeric check
-        numeric_fields = ["Bags", "Bill Wt (Qtl)", "Kanda Wt with Bardana(Qtl)", 
-                         "Basic Rate as per Bill", "Sauda", "Moist(%)", "Fungus", "Broken"]
-        for field in numeric_fields:
-            try:
-                value = values[all_columns.index(field)]
-                if value and value != "" and not isinstance(value, (int, float)):
-                    # Try to convert string to float
-                    try:
-                        float_val = float(str(value).replace(',', ''))  # Remove commas
-                        if not isinstance(float_val, (int, float)):
-                            raise ValueError
-                    except ValueError:
-                        errors.append(f"Row {row_idx}: {field} must be numeric")
-            except Exception as e:
-                if field in required_fields:  # Only show error for required fields
-                    errors.append(f"Row {row_idx}: {field} must be numeric")
-
-        # Date format check
-        try:
-            bill_date = values[all_columns.index("Bill Date")]
-            if bill_date:
-                datetime.strptime(str(bill_date), "%d/%m/%Y")
-        except Exception:
-            errors.append(f"Row {row_idx}: Bill Date must be in DD/MM/YYYY format")
-
-    # Show results
-    if errors:
-        messagebox.showerror("Entry Check Failed", "\n".join(errors))
-        return False
-    else:
-        messagebox.showinfo("Entry Check", "✅ All entries are valid!")
-        return True
+import os
+import time
+import tkinter as tk
+from tkinter import filedialog, messagebox, ttk
+from tkinter import messagebox
+from bulk_import import find_import_files
+
+
+
+# entry_viewer.py
+
+# Most problems listed in the Check Entries message box
+MAX_REPORTED_ERRORS = 50
+
+
+def view_data(table, batch, on_finish=None):
+    """
+    Replace the batch (an EntryBatch) with the rows of one Excel file.
+    Rows are read and added in timed batches via after() (see _ImportDialog),
+    so the window stays responsive and the load can be cancelled.
+    :param on_finish: callback run once the rows are in (also after cancel or error)
+    """
+    filepath = filedialog.askopenfilename(
+        defaultextension=".xlsx",
+        filetypes=[("Excel Files", "*.xlsx")],
+        initialdir="exports",
+        title="Open Excel File"
+    )
+
+    if not filepath:
+        return  # user cancelled
+
+    try:
+        reader = batch.open_file(filepath)
+    except Exception as e:
+        messagebox.showerror("Error", f"Failed to load Excel file:\n{e}")
+        return
+
+    _ViewDataDialog(table, batch, reader, on_finish)
+
+
+# entry_checker.py
+
+def check_entries(batch):
+    """
+    Report problems in the TreeView entries (an EntryBatch) before export.
+    Rows are validated as they are added or edited (see validation.py), so this
+    only collects the stored results.
+    """
+    errors = batch.problems()
+
+    # Show results
+    if errors:
+        shown = errors[:MAX_REPORTED_ERRORS]
+        if len(errors) > len(shown):
+            shown.append(f"... and {len(errors) - len(shown)} more")
+        messagebox.showerror("Entry Check Failed", "\n".join(shown))
+        return False
+    else:
+        messagebox.showinfo("Entry Check", "✅ All entries are valid!")
+        return True
+
+
+# bulk_loader.py
+
+# How often the bulk import dialog checks on the worker processes (ms)
+BULK_POLL_MS = 100
+
+# Time slice (ms) spent adding rows before handing control back to Tk
+IMPORT_SLICE_MS = 40
+
+
+def bulk_import(table, batch, on_finish=None):
+    """
+    Import every .xlsx and .csv file of a folder into the current batch (an EntryBatch).
+    Files are parsed in worker processes (see bulk_import.py); rows already in the
+    batch or repeated across files are skipped, and suggestions are harvested
+    from the same pass.
+    :param on_finish: callback run after the rows are added (updates the footer)
+    """
+    folder = filedialog.askdirectory(initialdir="exports", title="Import All Files in Folder")
+    if not folder:
+        return  # user cancelled
+
+    paths = find_import_files(folder)
+    if not paths:
+        messagebox.showinfo("Bulk Import", f"No .xlsx or .csv files in:\n{folder}")
+        return
+
+    _BulkImportDialog(table, batch, batch.import_job(paths).start(), on_finish)
+
+
+class _ImportDialog:
+    """
+    Progress dialog that adds rows to the batch a time slice at a time via after(),
+    so the window stays responsive and the import can be cancelled. ``steps`` is
+    one of EntryBatch's step generators; each step yields the rows added so far.
+    """
+
+    title = "Import"
+
+    def __init__(self, table, batch, on_finish=None):
+        self.table = table
+        self.batch = batch
+        self.on_finish = on_finish
+        self.steps = None
+        self.total = 0
+        self.added = 0
+        self.cancelled = False
+
+        self.dialog = tk.Toplevel(table)
+        self.dialog.title(self.title)
+        self.dialog.resizable(False, False)
+        self.label = ttk.Label(self.dialog, text="")
+        self.label.pack(padx=10, pady=(10, 5))
+        self.progress = ttk.Progressbar(self.dialog, length=300, mode="determinate")
+        self.progress.pack(padx=10, pady=5)
+        ttk.Button(self.dialog, text="Cancel", command=self.cancel).pack(pady=(5, 10))
+        self.dialog.protocol("WM_DELETE_WINDOW", self.cancel)
+        self.dialog.transient(table.winfo_toplevel())
+        self.dialog.grab_set()  # keep edits out of the TreeView while it fills
+
+    def cancel(self):
+        self.cancelled = True
+
+    def feed(self, steps, total=None):
+        """Start adding rows; ``total`` is the number expected, if known."""
+        self.steps = steps
+        self.total = total
+        self.progress.config(value=0, maximum=max(total or 0, 1),
+                             mode="determinate" if total else "indeterminate")
+        self.table.after(1, self.step)
+
+    def step(self):
+        """Add rows until the time slice is used up, then reschedule."""
+        if self.cancelled:
+            self.steps.close()
+            self.finish()
+            return
+        try:
+            deadline = time.perf_counter() + IMPORT_SLICE_MS / 1000
+            for added in self.steps:
+                self.added = added
+                if time.perf_counter() >= deadline:
+                    break
+            else:
+                self.finish()
+                return
+        except Exception as e:
+            self.finish(error=e)
+            return
+
+        if self.total:
+            self.progress.config(value=self.added)
+        else:
+            self.progress.step()
+        self.label.config(text=f"Added {self.added} of {self.total or '?'} rows...")
+        self.table.refresh()
+        self.table.after(1, self.step)
+
+    def close(self):
+        self.dialog.grab_release()
+        self.dialog.destroy()
+
+    def finish(self, error=None):
+        self.close()
+        if self.on_finish:
+            self.on_finish()
+        self.table.refresh()
+        if error is not None:
+            messagebox.showerror("Error", self.error_message(error))
+        else:
+            messagebox.showinfo(self.title, self.summary())
+
+    def error_message(self, error):
+        return f"{self.title} failed:\n{error}"
+
+    def summary(self):
+        return f"Added {self.added} rows."
+
+
+class _BulkImportDialog(_ImportDialog):
+    """Progress dialog for a BulkImportJob; adds its rows to the TreeView once the files are read."""
+
+    title = "Bulk Import"
+
+    def __init__(self, table, batch, job, on_finish=None):
+        super().__init__(table, batch, on_finish)
+        self.job = job
+        self.progress.config(maximum=max(job.total, 1))
+        self.label.config(text=f"Reading {job.total} files...")
+        self.table.after(BULK_POLL_MS, self.poll)
+
+    def cancel(self):
+        super().cancel()
+        self.job.cancel()
+
+    def poll(self):
+        job = self.job
+        self.progress.config(value=job.files_done)
+        self.label.config(text=f"Read {job.files_done} of {job.total} files...")
+        if not job.done:
+            self.table.after(BULK_POLL_MS, self.poll)
+            return
+
+        if job.cancelled:
+            self.close()
+            messagebox.showinfo(self.title, "Import cancelled; no rows were added.")
+            return
+        if job.error is not None:
+            self.close()
+            messagebox.showerror("Error", self.error_message(job.error))
+            return
+        self.add_rows()
+
+    def add_rows(self):
+        self.label.config(text=f"Adding {len(self.job.rows)} rows...")
+        self.feed(self.batch.import_steps(self.job), len(self.job.rows))
+
+    def summary(self):
+        job = self.job
+        if self.cancelled:
+            return f"Import cancelled after {self.added} of {len(job.rows)} rows."
+        lines = [f"Imported {len(job.rows)} rows from {job.total - len(job.failed)} files."]
+        if job.duplicates:
+            lines.append(f"{job.duplicates} repeated rows were skipped.")
+        if job.failed:
+            lines.append("\nThese files could not be read:")
+            lines.extend(f"{os.path.basename(path)}: {error}" for path, error in job.failed)
+        return "\n".join(lines)
+
+
+class _ViewDataDialog(_ImportDialog):
+    """Progress dialog for EntryBatch.load_steps(); the file's rows replace the batch."""
+
+    title = "View Data"
+
+    def __init__(self, table, batch, reader, on_finish=None):
+        super().__init__(table, batch, on_finish)
+        self.reader = reader
+        self.label.config(text=f"Loading {os.path.basename(reader.path)}...")
+        self.feed(batch.load_steps(reader), reader.total)
+
+    def finish(self, error=None):
+        self.reader.close()  # if cancelled before the first step
+        super().finish(error)
+
+    def error_message(self, error):
+        return f"Failed to load Excel file:\n{error}"
+
+    def summary(self):
+        if self.cancelled:
+            return f"Import cancelled after {self.added} rows from:\n{self.reader.path}"
+        return f"Data loaded and suggestions updated from:\n{self.reader.path}"
@@ -0,0 +1,255 @@
+# formula_batch.py
+import numpy as np
+from functools import lru_cache, reduce
+from formula_engine import ERROR_VALUES, FormulaError, compile_formula, to_number
+
+# Error arrays hold 0 for "no error", otherwise 1 + the index into ERROR_VALUES.
+# As in the scalar evaluator, the first error met left-to-right is the one reported.
+_NO_ERROR = 0
+_DIV0, _VALUE, _NUM, _REF = (
+    ERROR_VALUES.index(code) + 1 for code in ("#DIV/0!", "#VALUE!", "#NUM!", "#REF!")
+)
+
+
+def error_value(code):
+    """Map an error code from an errors array back to its Excel error value."""
+    return ERROR_VALUES[code - 1] if code else None
+
+
+def to_number_array(values):
+    """
+    Convert a column of cell values to (float64 values, error codes),
+    applying the same rules as formula_engine.to_number.
+    """
+    if isinstance(values, np.ndarray) and values.dtype.kind in "biuf":
+        return values.astype(np.float64, copy=False), _NO_ERROR
+
+    # Fast path for clean numeric columns; numpy would turn None into NaN, not 0
+    if not any(value is None for value in values):
+        try:
+            return np.asarray(values, dtype=np.float64), _NO_ERROR
+        except (TypeError, ValueError):
+            pass
+
+    numbers = np.zeros(len(values), dtype=np.float64)
+    errors = np.zeros(len(values), dtype=np.int8)
+    for idx, value in enumerate(values):
+        try:
+            numbers[idx] = to_number(value)
+        except FormulaError as e:
+            errors[idx] = ERROR_VALUES.index(e.code) + 1
+    return numbers, errors
+
+
+def round_array(values, digits=0):
+    """Vectorized excel_round(); performs the same float operations element-wise."""
+    digits = np.trunc(digits)
+    factor = np.power(10.0, np.abs(digits))
+    scaled = np.where(digits >= 0, np.abs(values) * factor, np.abs(values) / factor)
+    rounded = np.floor(scaled + 0.5 + 1e-12 * np.maximum(1.0, scaled))
+    rounded = np.where(digits >= 0, rounded / factor, rounded * factor)
+    return np.where(rounded != 0, np.copysign(rounded, values), 0.0)
+
+
+def _first_error(*errors):
+    result = _NO_ERROR
+    for err in reversed(errors):
+        if not isinstance(err, np.ndarray):
+            continue
+        result = err if not isinstance(result, np.ndarray) else np.where(err != 0, err, result)
+    return result
+
+
+def _flag(errors, mask, code):
+    """Set ``code`` where ``mask`` holds and no earlier error was recorded."""
+    if not np.any(mask):
+        return errors
+    return np.where((errors == 0) & mask, code, errors).astype(np.int8)
+
+
+class _Batch:
+    """Column arrays shared by every formula evaluated over one batch of rows."""
+
+    def __init__(self, columns, size, row_numbers):
+        self.columns = columns
+        self.size = size
+        self.row_numbers = row_numbers
+        self.values = {}  # column -> (float64 values, error codes)
+
+    def get(self, column):
+        if column not in self.values:
+            raw = self.columns.get(column)
+            if raw is None:
+                self.values[column] = (np.zeros(self.size), _NO_ERROR)  # blank cells
+            else:
+                self.values[column] = to_number_array(raw)
+        return self.values[column]
+
+
+# --- Compilation of syntax trees into array functions ---
+
+def _vectorize(node):
+    """Turn a formula syntax tree into ``f(batch) -> (values, errors)``."""
+    kind = node[0]
+    if kind == "num":
+        value = np.float64(node[1])
+        return lambda batch: (value, _NO_ERROR)
+    if kind == "ref":
+        column = node[1]
+        return lambda batch: batch.get(column)
+    if kind == "neg":
+        operand = _vectorize(node[1])
+
+        def negate(batch):
+            values, errors = operand(batch)
+            return -values, errors
+        return negate
+    if kind == "cmp":
+        return _vectorize_comparison(node[1], _vectorize(node[2]), _vectorize(node[3]))
+    if kind == "bin":
+        return _vectorize_binary(node[1], _vectorize(node[2]), _vectorize(node[3]))
+    return _vectorize_call(node[1], [_vectorize(arg) for arg in node[2]])
+
+
+_COMPARE = {
+    "=": np.equal, "<>": np.not_equal, "<": np.less,
+    ">": np.greater, "<=": np.less_equal, ">=": np.greater_equal,
+}
+
+
+def _vectorize_comparison(op, left, right):
+    compare = _COMPARE[op]
+
+    def evaluate(batch):
+        l_values, l_errors = left(batch)
+        r_values, r_errors = right(batch)
+        return compare(l_values, r_values).astype(np.float64), _first_error(l_errors, r_errors)
+    return evaluate
+
+
+def _vectorize_binary(op, left, right):
+    def evaluate(batch):
+        l_values, l_errors = left(batch)
+        r_values, r_errors = right(batch)
+        errors = _first_error(l_errors, r_errors)
+        if op == "+":
+            return l_values + r_values, errors
+        if op == "-":
+            return l_values - r_values, errors
+        if op == "*":
+            return l_values * r_values, errors
+        if op == "/":
+            errors = _flag(_as_array(errors, batch), np.equal(r_values, 0), _DIV0)
+            return l_values / np.where(r_values == 0, 1.0, r_values), errors
+        # Python's ** rather than np.power, so results match the scalar evaluator bit for bit
+        values = np.asarray(_python_pow(l_values, r_values), dtype=np.float64)
+        return values, _flag(_as_array(errors, batch), np.isnan(values), _NUM)
+    return evaluate
+
+
+def _scalar_pow(left, right):
+    try:
+        return float(left ** right)
+    except (OverflowError, ZeroDivisionError, TypeError):
+        return np.nan
+
+
+_python_pow = np.frompyfunc(_scalar_pow, 2, 1)
+
+
+def _vectorize_call(name, args):
+    if name == "IF":
+        condition, when_true = args[0], args[1]
+        when_false = args[2] if len(args) == 3 else (lambda batch: (np.float64(0.0), _NO_ERROR))
+
+        def evaluate_if(batch):
+            c_values, c_errors = condition(batch)
+            t_values, t_errors = when_true(batch)
+            f_values, f_errors = when_false(batch)
+            chosen = c_values != 0
+            values = np.where(chosen, t_values, f_values)
+            branch_errors = _NO_ERROR
+            if isinstance(t_errors, np.ndarray) or isinstance(f_errors, np.ndarray):
+                branch_errors = np.where(chosen, t_errors, f_errors)
+            return values, _first_error(c_errors, branch_errors)
+        return evaluate_if
+
+    if name == "ROW":
+        return lambda batch: (batch.row_numbers, _NO_ERROR)
+
+    def evaluate_call(batch):
+        results = [arg(batch) for arg in args]
+        values = [v for v, _ in results]
+        errors = _first_error(*(e for _, e in results))
+        if name == "AND":
+            return reduce(np.logical_and, [v != 0 for v in values]).astype(np.float64), errors
+        if name == "OR":
+            return reduce(np.logical_or, [v != 0 for v in values]).astype(np.float64), errors
+        if name == "NOT":
+            return (values[0] == 0).astype(np.float64), errors
+        if name == "MIN":
+            return reduce(np.minimum, values), errors
+        if name == "MAX":
+            return reduce(np.maximum, values), errors
+        if name == "SUM":
+            total = values[0]
+            for value in values[1:]:
+                total = total + value
+            return total, errors
+        if name == "ABS":
+            return np.abs(values[0]), errors
+        # ROUND
+        return round_array(values[0], values[1] if len(values) > 1 else 0.0), errors
+    return evaluate_call
+
+
+def _as_array(errors, batch):
+    return errors if isinstance(errors, np.ndarray) else np.zeros(batch.size, dtype=np.int8)
+
+
+@lru_cache(maxsize=256)
+def _vector_formula(column, source):
+    return _vectorize(compile_formula(column, source).tree)
+
+
+# --- Batch evaluation ---
+
+def evaluate_batch(graph, columns, row_count=None, row_numbers=None):
+    """
+    Evaluate every formula over whole columns at once.
+    :param graph: FormulaGraph from formula_engine.formula_graph()
+    :param columns: dict of column name -> sequence of cell values (one per row)
+    :param row_count: number of rows; defaults to the length of the first column
+    :param row_numbers: worksheet row of each record; defaults to 2, 3, 4, ...
+    :return: dict of formula column -> (float64 values, int8 error codes);
+             values are NaN wherever the error code is non-zero
+    """
+    if row_count is None:
+        row_count = len(next(iter(columns.values()))) if columns else 0
+    if row_numbers is None:
+        row_numbers = np.arange(2, row_count + 2, dtype=np.float64)
+    batch = _Batch(columns, row_count, np.asarray(row_numbers, dtype=np.float64))
+
+    results = {}
+    with np.errstate(all="ignore"):
+        for col in graph.order:
+            formula = graph.compiled[col]
+            values, errors = _vector_formula(formula.column, formula.source)(batch)
+            values = np.broadcast_to(np.asarray(values, dtype=np.float64), (row_count,)).copy()
+            errors = np.broadcast_to(np.asarray(errors, dtype=np.int8), (row_count,)).copy()
+            values[errors != 0] = np.nan
+            # Later formulas read this column's computed values, not the raw cells
+            batch.values[col] = (values, errors)
+            results[col] = (values, errors)
+
+    for col in graph.cyclic:
+        results[col] = (np.full(row_count, np.nan), np.full(row_count, _REF, dtype=np.int8))
+    return results
+
+
+def batch_row(results, index):
+    """Return one row of evaluate_batch() output in the scalar evaluator's format."""
+    row = {}
+    for col, (values, errors) in results.items():
+        row[col] = error_value(int(errors[index])) if errors[index] else float(values[index])
+    return row
@@ -0,0 +1,473 @@
+# formula_engine.py
+import math
+import re
+from functools import lru_cache
+
+# Excel-style error values produced while evaluating a formula
+ERROR_VALUES = ("#DIV/0!", "#VALUE!", "#NUM!", "#REF!", "#NAME?")
+
+_TOKEN_RE = re.compile(r"""
+    \s*(?:
+        (?P<number>\d+\.?\d*(?:[eE][-+]?\d+)?|\.\d+(?:[eE][-+]?\d+)?)
+      | \[(?P<ref>[^\]]+)\]
+      | (?P<name>[A-Za-z_][A-Za-z0-9_.]*)
+      | (?P<op><=|>=|<>|[-+*/^(),<>=])
+    )""", re.VERBOSE)
+
+_COMPARISONS = {"=": "==", "<>": "!=", "<": "<", ">": ">", "<=": "<=", ">=": ">="}
+
+# Functions understood by the evaluator, with their (min, max) argument counts
+_FUNCTIONS = {
+    "IF": (2, 3),
+    "AND": (1, None),
+    "OR": (1, None),
+    "NOT": (1, 1),
+    "MIN": (1, None),
+    "MAX": (1, None),
+    "SUM": (1, None),
+    "ABS": (1, 1),
+    "ROUND": (1, 2),
+    "ROW": (0, 0),
+}
+
+
+class FormulaError(Exception):
+    """Raised when a formula cannot be parsed or evaluated.
+
+    ``code`` holds the Excel error value shown in place of a result.
+    """
+
+    def __init__(self, code, message=None):
+        super().__init__(message or code)
+        self.code = code
+
+
+# --- Parsing ---
+
+def tokenize(formula):
+    """Split a column-name formula into (kind, text) tokens."""
+    text = formula.strip()
+    if text.startswith("="):
+        text = text[1:]
+
+    tokens = []
+    pos = 0
+    while pos < len(text):
+        match = _TOKEN_RE.match(text, pos)
+        if not match or match.end() == pos:
+            if text[pos:].strip() == "":
+                break
+            raise FormulaError("#NAME?", f"Unexpected text in formula: {text[pos:]!r}")
+        pos = match.end()
+        kind = match.lastgroup
+        tokens.append((kind, match.group(kind)))
+    return tokens
+
+
+class _Parser:
+    """Recursive-descent parser producing a small tuple-based syntax tree.
+
+    Nodes: ("num", value), ("ref", column), ("neg", node),
+    ("bin", op, left, right), ("cmp", op, left, right), ("call", name, args).
+    """
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def take(self, text=None):
+        kind, value = self.peek()
+        if kind is None or (text is not None and value != text):
+            raise FormulaError("#NAME?", f"Expected {text or 'a value'} in formula")
+        self.pos += 1
+        return kind, value
+
+    def parse(self):
+        node = self.comparison()
+        if self.pos != len(self.tokens):
+            raise FormulaError("#NAME?", f"Unexpected {self.peek()[1]!r} in formula")
+        return node
+
+    def comparison(self):
+        node = self.additive()
+        while self.peek()[0] == "op" and self.peek()[1] in _COMPARISONS:
+            op = self.take()[1]
+            node = ("cmp", op, node, self.additive())
+        return node
+
+    def additive(self):
+        node = self.multiplicative()
+        while self.peek() in (("op", "+"), ("op", "-")):
+            op = self.take()[1]
+            node = ("bin", op, node, self.multiplicative())
+        return node
+
+    def multiplicative(self):
+        node = self.power()
+        while self.peek() in (("op", "*"), ("op", "/")):
+            op = self.take()[1]
+            node = ("bin", op, node, self.power())
+        return node
+
+    def power(self):
+        node = self.unary()
+        while self.peek() == ("op", "^"):
+            self.take()
+            node = ("bin", "^", node, self.unary())
+        return node
+
+    def unary(self):
+        # Like Excel, negation binds tighter than ^ (so -2^2 is 4)
+        if self.peek() == ("op", "-"):
+            self.take()
+            return ("neg", self.unary())
+        if self.peek() == ("op", "+"):
+            self.take()
+            return self.unary()
+        return self.primary()
+
+    def primary(self):
+        kind, value = self.take()
+        if kind == "number":
+            return ("num", float(value))
+        if kind == "ref":
+            return ("ref", value.strip())
+        if kind == "op" and value == "(":
+            node = self.comparison()
+            self.take(")")
+            return node
+        if kind == "name":
+            name = value.upper()
+            if self.peek() != ("op", "("):
+                if name in ("TRUE", "FALSE"):
+                    return ("num", 1.0 if name == "TRUE" else 0.0)
+                raise FormulaError("#NAME?", f"Unknown name {value!r} in formula")
+            return self.call(name)
+        raise FormulaError("#NAME?", f"Unexpected {value!r} in formula")
+
+    def call(self, name):
+        if name not in _FUNCTIONS:
+            raise FormulaError("#NAME?", f"Unsupported function {name}()")
+        self.take("(")
+        args = []
+        if self.peek() != ("op", ")"):
+            args.append(self.comparison())
+            while self.peek() == ("op", ","):
+                self.take()
+                args.append(self.comparison())
+        self.take(")")
+
+        low, high = _FUNCTIONS[name]
+        if len(args) < low or (high is not None and len(args) > high):
+            raise FormulaError("#NAME?", f"Wrong number of arguments to {name}()")
+        return ("call", name, tuple(args))
+
+
+def parse_formula(formula):
+    """Parse a formula such as ``=[Bill Wt (Qtl)] * [Basic Rate as per Bill]``."""
+    return _Parser(tokenize(formula)).parse()
+
+
+def formula_references(node):
+    """Return the column names referenced by a parsed formula, in first-use order."""
+    refs = []
+
+    def walk(n):
+        if n[0] == "ref":
+            if n[1] not in refs:
+                refs.append(n[1])
+        elif n[0] == "neg":
+            walk(n[1])
+        elif n[0] in ("bin", "cmp"):
+            walk(n[2])
+            walk(n[3])
+        elif n[0] == "call":
+            for arg in n[2]:
+                walk(arg)
+
+    walk(node)
+    return refs
+
+
+# --- Runtime helpers used by compiled formulas ---
+
+def to_number(value):
+    """Convert a cell value to a number the way Excel does for arithmetic."""
+    if value is None or value == "":
+        return 0.0
+    if isinstance(value, bool):
+        return 1.0 if value else 0.0
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).strip()
+    if text in ERROR_VALUES:
+        raise FormulaError(text)
+    try:
+        return float(text.replace(",", ""))
+    except ValueError:
+        raise FormulaError("#VALUE!", f"{value!r} is not a number")
+
+
+def excel_round(value, digits=0):
+    """ROUND() with Excel's half-away-from-zero rule instead of banker's rounding."""
+    digits = int(digits)
+    scaled = abs(value) * 10.0 ** digits if digits >= 0 else abs(value) / 10.0 ** -digits
+    # Absorb binary representation error so ROUND(2.675, 2) gives 2.68 like Excel
+    rounded = math.floor(scaled + 0.5 + 1e-12 * max(1.0, scaled))
+    rounded = rounded / 10.0 ** digits if digits >= 0 else rounded * 10.0 ** -digits
+    return math.copysign(rounded, value) if rounded else 0.0
+
+
+def _ref(row, column):
+    return to_number(row.get(column))
+
+
+def _div(left, right):
+    if right == 0:
+        raise FormulaError("#DIV/0!")
+    return left / right
+
+
+def _pow(left, right):
+    try:
+        return float(left ** right)
+    except (OverflowError, ZeroDivisionError, TypeError):
+        raise FormulaError("#NUM!")
+
+
+def _and(*values):
+    return all(values)
+
+
+def _or(*values):
+    return any(values)
+
+
+_RUNTIME = {
+    "_ref": _ref,
+    "_div": _div,
+    "_pow": _pow,
+    "_and": _and,
+    "_or": _or,
+    "_round": excel_round,
+}
+
+
+# --- Compilation ---
+
+def _to_python(node):
+    """Generate Python source for a parsed formula."""
+    kind = node[0]
+    if kind == "num":
+        return repr(node[1])
+    if kind == "ref":
+        return f"_ref(row, {node[1]!r})"
+    if kind == "neg":
+        return f"(-{_to_python(node[1])})"
+    if kind == "bin":
+        op, left, right = node[1], _to_python(node[2]), _to_python(node[3])
+        if op == "/":
+            return f"_div({left}, {right})"
+        if op == "^":
+            return f"_pow({left}, {right})"
+        return f"({left} {op} {right})"
+    if kind == "cmp":
+        return f"({_to_python(node[2])} {_COMPARISONS[node[1]]} {_to_python(node[3])})"
+
+    name, args = node[1], [_to_python(arg) for arg in node[2]]
+    if name == "IF":
+        otherwise = args[2] if len(args) == 3 else "False"
+        return f"({args[1]} if {args[0]} else {otherwise})"
+    if name == "AND":
+        return f"_and({', '.join(args)})"
+    if name == "OR":
+        return f"_or({', '.join(args)})"
+    if name == "NOT":
+        return f"(not {args[0]})"
+    if name in ("MIN", "MAX"):
+        # min()/max() need two arguments; float() turns a lone TRUE into 1.0
+        return f"{name.lower()}({', '.join(args)}, {args[0]})"
+    if name == "SUM":
+        return f"({' + '.join(args)})"
+    if name == "ABS":
+        return f"abs({args[0]})"
+    if name == "ROUND":
+        return f"_round({', '.join(args)})"
+    # ROW(): the worksheet row the record will be written to
+    return "float(row_number)"
+
+
+class CompiledFormula:
+    """A formula parsed and compiled once into a Python callable.
+
+    Call ``func(row, row_number)`` where ``row`` maps column names to cell values.
+    """
+
+    __slots__ = ("column", "source", "tree", "references", "func")
+
+    def __init__(self, column, source):
+        self.column = column
+        self.source = source
+        self.tree = parse_formula(source)
+        self.references = tuple(formula_references(self.tree))
+        self.func = _compile_tree(self.tree)
+
+    def evaluate(self, row, row_number):
+        """Evaluate against one row, returning a number or an Excel error value."""
+        try:
+            return self.func(row, row_number)
+        except FormulaError as e:
+            return e.code
+        except (ArithmeticError, ValueError, TypeError):
+            return "#VALUE!"
+
+
+def _compile_tree(tree):
+    code = compile(f"lambda row, row_number: {_to_python(tree)}", "<formula>", "eval")
+    return eval(code, dict(_RUNTIME))
+
+
+@lru_cache(maxsize=256)
+def compile_formula(column, source):
+    """Compile a single formula; identical formulas are only compiled once."""
+    return CompiledFormula(column, source)
+
+
+def compile_formulas(formulas):
+    """
+    Compile the formulas.json mapping into {column: CompiledFormula}.
+    Columns with an empty or invalid formula are skipped and reported.
+    """
+    compiled = {}
+    for col, details in formulas.items():
+        source = (details or {}).get("formula", "").strip()
+        if not source:
+            continue
+        try:
+            compiled[col] = compile_formula(col, source)
+        except FormulaError as e:
+            print(f"Skipping formula for {col}: {e}")
+    return compiled
+
+
+# --- Dependency graph ---
+
+# Pseudo-input standing for the worksheet row number, so ROW() formulas can be
+# recomputed when rows are renumbered (e.g. after a delete)
+ROW_INPUT = "ROW()"
+
+
+def _uses_function(node, name):
+    if node[0] == "call":
+        return node[1] == name or any(_uses_function(arg, name) for arg in node[2])
+    if node[0] == "neg":
+        return _uses_function(node[1], name)
+    if node[0] in ("bin", "cmp"):
+        return _uses_function(node[2], name) or _uses_function(node[3], name)
+    return False
+
+
+class FormulaGraph:
+    """
+    Dependency graph between formula columns, built from their [Column] references.
+    Formulas are evaluated in topological order, and downstream() lists exactly the
+    formula columns that have to be recomputed when some inputs change.
+    """
+
+    def __init__(self, compiled):
+        self.compiled = compiled
+        self.dependents = {}  # column -> formula columns that reference it
+        for col, formula in compiled.items():
+            inputs = list(formula.references)
+            if _uses_function(formula.tree, "ROW"):
+                inputs.append(ROW_INPUT)
+            for ref in inputs:
+                self.dependents.setdefault(ref, []).append(col)
+
+        self.order, self.cyclic = self._topological_order()
+        # Columns the formulas read that none of them computes: what a batch evaluation needs
+        computed = set(self.order)
+        self.inputs = list(dict.fromkeys(
+            ref for formula in compiled.values() for ref in formula.references if ref not in computed
+        ))
+        self._position = {col: idx for idx, col in enumerate(self.order)}
+        self._downstream_cache = {}
+
+    def _topological_order(self):
+        """Kahn's algorithm; columns caught in a reference cycle are returned separately."""
+        pending = {
+            col: sum(1 for ref in set(formula.references) if ref in self.compiled)
+            for col, formula in self.compiled.items()
+        }
+        # Keep formulas.json order among columns that are ready at the same time
+        ready = [col for col in self.compiled if pending[col] == 0]
+        order = []
+        while ready:
+            col = ready.pop(0)
+            order.append(col)
+            for dependent in self.dependents.get(col, []):
+                pending[dependent] -= 1
+                if pending[dependent] == 0:
+                    ready.append(dependent)
+        cyclic = [col for col in self.compiled if pending[col] > 0]
+        if cyclic:
+            print(f"Circular formula references: {', '.join(cyclic)}")
+        return order, cyclic
+
+    def downstream(self, changed):
+        """Formula columns affected by a change to ``changed`` columns, in evaluation order."""
+        key = frozenset(changed)
+        if key not in self._downstream_cache:
+            affected = set()
+            stack = list(key)
+            while stack:
+                for dependent in self.dependents.get(stack.pop(), []):
+                    if dependent not in affected:
+                        affected.add(dependent)
+                        stack.append(dependent)
+            self._downstream_cache[key] = [col for col in self.order if col in affected]
+        return self._downstream_cache[key]
+
+    def evaluate(self, row, row_number, changed=None):
+        """
+        Evaluate formulas for one row.
+        :param row: dict of column name -> value; formula columns that are not
+                    recomputed are read from here as they are
+        :param row_number: worksheet row the record occupies (header is row 1)
+        :param changed: columns whose values changed; None recomputes everything
+        :return: dict of recomputed formula column -> number or Excel error value
+        """
+        columns = self.order if changed is None else self.downstream(changed)
+        values = dict(row)
+        results = {}
+        for col in columns:
+            results[col] = values[col] = self.compiled[col].evaluate(values, row_number)
+        if changed is None:
+            for col in self.cyclic:
+                results[col] = "#REF!"
+        return results
+
+
+@lru_cache(maxsize=16)
+def _graph_for(sources):
+    return FormulaGraph(compile_formulas({col: {"formula": src} for col, src in sources}))
+
+
+def formula_graph(formulas):
+    """Return the (cached) FormulaGraph for a formulas.json mapping."""
+    sources = tuple((col, (details or {}).get("formula", "")) for col, details in formulas.items())
+    return _graph_for(sources)
+
+
+def display_value(value):
+    """Tidy a computed value for display: whole numbers without decimals, others to 6 places."""
+    if isinstance(value, bool) or not isinstance(value, float):
+        return value
+    if math.isnan(value) or math.isinf(value):
+        return "#NUM!"
+    if value.is_integer():
+        return int(value)
+    return round(value, 6)
@@ -0,0 +1,127 @@
+# formula_store.py
+import hashlib
+import json
+import os
+import threading
+import time
+from path_utils import get_resource_path
+from formula_engine import formula_graph
+
+FORMULA_FILE = get_resource_path("formulas.json")
+
+# How often (seconds) the file is stat()ed for outside changes. Keeps rapid
+# entry on a network-share install from paying a disk round-trip per row.
+CHECK_INTERVAL = 2.0
+
+
+class FormulaStore:
+    """
+    Single shared copy of formulas.json.
+
+    The file is read, validated and compiled once; later calls are served from
+    memory until the file's mtime/size and content hash change, or save() is called.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._formulas = {}
+        self._graph = formula_graph({})
+        self._stat = None
+        self._digest = None
+        self._checked_at = None
+
+    def formulas(self):
+        """Return the formulas.json mapping. Shared between callers: do not modify it."""
+        self._refresh()
+        return self._formulas
+
+    def graph(self):
+        """Return the compiled FormulaGraph for the current formulas."""
+        self._refresh()
+        return self._graph
+
+    def invalidate(self):
+        """Force the next access to re-check the file."""
+        with self._lock:
+            self._checked_at = None
+            self._stat = None
+
+    def save(self, formulas):
+        """Write formulas.json atomically and refresh the in-memory copy."""
+        data = json.dumps(formulas, indent=2, ensure_ascii=False).encode("utf-8")
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, self.path)
+        with self._lock:
+            self._load(data, self._file_stat())
+
+    def _file_stat(self):
+        try:
+            st = os.stat(self.path)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def _refresh(self):
+        now = time.monotonic()
+        with self._lock:
+            if self._checked_at is not None and now - self._checked_at < CHECK_INTERVAL:
+                return
+            self._checked_at = now
+
+            stat = self._file_stat()
+            if stat is None:
+                print(f"formulas.json not found at {self.path}")
+                self._stat = None
+                return
+            if stat == self._stat:
+                return
+
+            try:
+                with open(self.path, "rb") as f:
+                    data = f.read()
+            except OSError as e:
+                print(f"Error loading formulas from {self.path}: {e}")
+                return
+            self._load(data, stat)
+
+    def _load(self, data, stat):
+        """Validate and compile file contents, unless they are unchanged (same hash)."""
+        self._stat = stat
+        digest = hashlib.sha1(data).hexdigest()
+        if digest == self._digest:
+            return
+
+        try:
+            formulas = json.loads(data.decode("utf-8"))
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            # Keep serving the last good version rather than breaking entry
+            print(f"Error loading formulas from {self.path}: {e}")
+            return
+        if not isinstance(formulas, dict):
+            print(f"Ignoring {self.path}: expected an object of column formulas")
+            return
+
+        formulas = {
+            col: details for col, details in formulas.items()
+            if isinstance(details, dict) and isinstance(details.get("formula", ""), str)
+        }
+        self._formulas = formulas
+        self._graph = formula_graph(formulas)
+        self._digest = digest
+        print(f"Successfully loaded formulas from {self.path}")
+
+
+formula_store = FormulaStore(FORMULA_FILE)
+
+
+def load_formulas():
+    """Return the shared formulas.json mapping (cached; do not modify)."""
+    return formula_store.formulas()
+
+
+def get_formula_graph():
+    """Return the shared, compiled FormulaGraph."""
+    return formula_store.graph()
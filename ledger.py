@@ -0,0 +1,216 @@
+# ledger.py
+import sqlite3
+import time
+from datetime import date, datetime
+from path_utils import get_resource_path
+from aggregation import GroupTotals, SUMMARY_GROUPS, SUMMARY_MEASURES
+
+LEDGER_FILE = get_resource_path("ledger.db")
+
+# Most rows a ledger search returns
+RESULT_LIMIT = 1000
+
+# Text columns compared without regard to case (and searched by prefix)
+TEXT_KEYS = ["Bill No.", "Party Name", "Vehicle No."]
+
+# Date columns, also stored as sortable YYYY-MM-DD keys for range searches
+DATE_KEYS = {"Bill Date": "bill_date_key", "Arrival Lot date": "arrival_date_key"}
+
+DATE_FORMATS = ["%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y", "%Y-%m-%d", "%d/%m/%y"]
+
+
+def quote(name):
+    """Quote a column name for SQL ("Bill Wt (Qtl)" etc. contain spaces and brackets)."""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def date_key(value):
+    """YYYY-MM-DD for a date cell (typed text or a datetime from Excel), else None."""
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if not isinstance(value, str) or not value.strip():
+        return None
+    text = value.strip().split(" ")[0]
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date().isoformat()
+        except ValueError:
+            pass
+    return None
+
+
+def _db_value(value):
+    if value is None or value == "":
+        return None
+    if isinstance(value, (datetime, date)):
+        return value.strftime("%d/%m/%Y")
+    if isinstance(value, (int, float, str)):
+        return value
+    return str(value)
+
+
+class Ledger:
+    """
+    SQLite record of every submitted lot, one row per lot with the app's columns.
+
+    Each call opens its own connection, so the ledger can be written from the
+    export thread and read from the Tk thread.
+    """
+
+    def __init__(self, columns, path=LEDGER_FILE):
+        self.columns = list(columns)
+        self.path = path
+        self._ready = False
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        if not self._ready:
+            self._create_schema(conn)
+            self._ready = True
+        return conn
+
+    def _create_schema(self, conn):
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS batches (
+                id INTEGER PRIMARY KEY,
+                submitted_at TEXT NOT NULL,
+                filepath TEXT,
+                row_count INTEGER NOT NULL
+            )""")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS lots (
+                id INTEGER PRIMARY KEY,
+                batch_id INTEGER NOT NULL REFERENCES batches(id),
+                row_number INTEGER NOT NULL,
+                bill_date_key TEXT,
+                arrival_date_key TEXT
+            )""")
+        # Columns are added one by one so a ledger survives columns being added later
+        existing = {row[1] for row in conn.execute("PRAGMA table_info(lots)")}
+        for col in self.columns:
+            if col not in existing:
+                collate = " COLLATE NOCASE" if col in TEXT_KEYS else ""
+                conn.execute(f"ALTER TABLE lots ADD COLUMN {quote(col)}{collate}")
+        # Text keys are indexed together with the arrival date, so "one party over a
+        # season" is answered from a single index range
+        for col in TEXT_KEYS:
+            if col in self.columns:
+                name = "idx_lots_" + col.lower().replace(".", "").replace(" ", "_")
+                conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON lots({quote(col)}, arrival_date_key)")
+        for key in DATE_KEYS.values():
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_lots_{key} ON lots({key})")
+        conn.commit()
+
+    # --- Writing ---
+
+    def record_batch(self, rows, filepath=None):
+        """Store one submitted batch (rows in ``columns`` order); returns the batch id."""
+        date_slots = [
+            (self.columns.index(col), key) for col, key in DATE_KEYS.items() if col in self.columns
+        ]
+        names = ["batch_id", "row_number"] + [key for _, key in date_slots] + self.columns
+        sql = f"INSERT INTO lots ({', '.join(quote(name) for name in names)}) " \
+              f"VALUES ({', '.join('?' * len(names))})"
+
+        conn = self._connect()
+        try:
+            with conn:
+                batch_id = conn.execute(
+                    "INSERT INTO batches (submitted_at, filepath, row_count) VALUES (?, ?, ?)",
+                    (datetime.now().isoformat(timespec="seconds"), filepath, len(rows)),
+                ).lastrowid
+                conn.executemany(sql, (
+                    [batch_id, row_number]
+                    + [date_key(row[idx]) if idx < len(row) else None for idx, _ in date_slots]
+                    + [_db_value(row[idx]) if idx < len(row) else None for idx in range(len(self.columns))]
+                    for row_number, row in enumerate(rows, start=2)
+                ))
+        finally:
+            conn.close()
+        return batch_id
+
+    # --- Searching ---
+
+    def search(self, party=None, bill_no=None, vehicle=None, date_from=None, date_to=None,
+               date_column="Arrival Lot date", limit=RESULT_LIMIT):
+        """
+        Find lots; text filters match from the start, ignoring case. Dates are
+        inclusive bounds on ``date_column`` in any format date_key() reads.
+        :return: (rows in ``columns`` order, newest first; seconds taken)
+        """
+        started = time.perf_counter()
+        where, params = [], []
+        for col, value in (("Party Name", party), ("Bill No.", bill_no), ("Vehicle No.", vehicle)):
+            if value:
+                escaped = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+                where.append(f"{quote(col)} LIKE ? ESCAPE '\\'")
+                params.append(escaped + "%")
+        key = DATE_KEYS[date_column]
+        # With a name/bill/vehicle filter its index is the narrow one; "+" keeps
+        # SQLite from walking the whole date range in date order instead
+        bounded = "+" + key if where else key
+        for bound, op in ((date_from, ">="), (date_to, "<=")):
+            if bound:
+                parsed = date_key(bound)
+                if parsed is None:
+                    raise ValueError(f"Not a date: {bound}")
+                where.append(f"{bounded} {op} ?")
+                params.append(parsed)
+
+        sql = f"SELECT {', '.join(quote(col) for col in self.columns)} FROM lots"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY {key} DESC, id DESC LIMIT ?"
+        params.append(limit)
+
+        conn = self._connect()
+        try:
+            rows = [list(row) for row in conn.execute(sql, params)]
+        finally:
+            conn.close()
+        return rows, time.perf_counter() - started
+
+    # --- Summaries ---
+
+    def summarise(self, date_from=None, date_to=None, date_column="Arrival Lot date",
+                  groups=SUMMARY_GROUPS, measures=SUMMARY_MEASURES):
+        """
+        Lots and totals per group over every submitted lot in a date range.
+        SQLite totals each distinct combination of the groups in one scan; those
+        (far fewer) rows are then rolled up into each grouping by GroupTotals.
+        Cells that are not numbers are left out of the totals, as in SUM().
+        :return: (summaries as GroupTotals.results(), measures, seconds taken)
+        """
+        started = time.perf_counter()
+        groups = [col for col in groups if col in self.columns]
+        measures = [col for col in measures if col in self.columns]
+        key = DATE_KEYS[date_column]
+        where, params = [], []
+        for bound, op in ((date_from, ">="), (date_to, "<=")):
+            if bound:
+                parsed = date_key(bound)
+                if parsed is None:
+                    raise ValueError(f"Not a date: {bound}")
+                where.append(f"{key} {op} ?")
+                params.append(parsed)
+        sums = [
+            f"SUM(CASE WHEN typeof({quote(col)}) IN ('integer', 'real') THEN {quote(col)} END)"
+            for col in measures
+        ]
+        sql = f"SELECT {', '.join([quote(col) for col in groups] + sums + ['COUNT(*)'])} FROM lots"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        if groups:
+            sql += f" GROUP BY {', '.join(quote(col) for col in groups)}"
+
+        totals = GroupTotals(groups + measures, groups, measures)
+        conn = self._connect()
+        try:
+            for row in conn.execute(sql, params):
+                totals.add_row(row, lots=row[-1])
+        finally:
+            conn.close()
+        return totals.results(), totals.measures, time.perf_counter() - started
@@ -0,0 +1,114 @@
+# ledger_view.py
+import tkinter as tk
+from tkinter import ttk, messagebox, filedialog
+import sqlite3
+from formula_engine import display_value
+from ledger import RESULT_LIMIT, DATE_KEYS
+from excel_handler import EXPORT_FOLDER, ensure_export_folder, write_summary_workbook
+
+
+class LedgerView(tk.Toplevel):
+    """Search the lots of all submitted batches (see ledger.py)."""
+
+    def __init__(self, master, ledger):
+        super().__init__(master)
+        self.title("Submitted Lots")
+        self.geometry("1400x600")
+        self.ledger = ledger
+
+        # --- Filters ---
+        filters = ttk.LabelFrame(self, text="Search (names and numbers match from the start; dates DD/MM/YYYY)")
+        filters.pack(fill="x", padx=10, pady=5)
+
+        self.filter_entries = {}
+        for idx, (key, label) in enumerate([
+            ("party", "Party Name"), ("bill_no", "Bill No."), ("vehicle", "Vehicle No."),
+            ("date_from", "From"), ("date_to", "To"),
+        ]):
+            ttk.Label(filters, text=label).grid(row=0, column=idx * 2, padx=5, pady=5, sticky="w")
+            entry = ttk.Entry(filters, width=18)
+            entry.grid(row=0, column=idx * 2 + 1, padx=5, pady=5)
+            entry.bind("<Return>", lambda e: self.search())
+            self.filter_entries[key] = entry
+
+        self.date_column = tk.StringVar(value="Arrival Lot date")
+        ttk.Combobox(filters, textvariable=self.date_column, values=list(DATE_KEYS),
+                     state="readonly", width=16).grid(row=0, column=10, padx=5, pady=5)
+        ttk.Button(filters, text="Search", command=self.search).grid(row=0, column=11, padx=5, pady=5)
+        ttk.Button(filters, text="Summary", command=self.export_summary).grid(row=0, column=12, padx=5, pady=5)
+
+        self.status_var = tk.StringVar(value="Enter a filter and press Search.")
+        ttk.Label(self, textvariable=self.status_var).pack(fill="x", padx=10)
+
+        # --- Results ---
+        frame = ttk.Frame(self)
+        frame.pack(fill="both", expand=True, padx=10, pady=5)
+        scroll_y = ttk.Scrollbar(frame, orient="vertical")
+        scroll_x = ttk.Scrollbar(frame, orient="horizontal")
+        self.tree = ttk.Treeview(frame, columns=ledger.columns, show="headings",
+                                 yscrollcommand=scroll_y.set, xscrollcommand=scroll_x.set)
+        scroll_y.config(command=self.tree.yview)
+        scroll_x.config(command=self.tree.xview)
+        scroll_y.pack(side="right", fill="y")
+        scroll_x.pack(side="bottom", fill="x")
+        self.tree.pack(fill="both", expand=True)
+        for col in ledger.columns:
+            self.tree.heading(col, text=col)
+            self.tree.column(col, width=120, anchor="center")
+
+        self.filter_entries["party"].focus_set()
+
+    def search(self):
+        filters = {key: entry.get().strip() for key, entry in self.filter_entries.items()}
+        try:
+            rows, seconds = self.ledger.search(date_column=self.date_column.get(), **filters)
+        except ValueError as e:
+            messagebox.showerror("Invalid Date", str(e), parent=self)
+            return
+        except sqlite3.Error as e:
+            messagebox.showerror("Ledger Error", f"Could not search the ledger:\n{e}", parent=self)
+            return
+
+        self.tree.delete(*self.tree.get_children())
+        for row in rows:
+            self.tree.insert("", "end", values=["" if v is None else display_value(v) for v in row])
+
+        more = f" (first {RESULT_LIMIT} shown)" if len(rows) >= RESULT_LIMIT else ""
+        self.status_var.set(f"{len(rows)} lots found in {seconds * 1000:.1f} ms{more}")
+
+    def export_summary(self):
+        """Totals by party, agent, committee and city for the dates entered, saved as a workbook."""
+        date_from = self.filter_entries["date_from"].get().strip()
+        date_to = self.filter_entries["date_to"].get().strip()
+        try:
+            summaries, measures, seconds = self.ledger.summarise(
+                date_from, date_to, date_column=self.date_column.get())
+        except ValueError as e:
+            messagebox.showerror("Invalid Date", str(e), parent=self)
+            return
+        except sqlite3.Error as e:
+            messagebox.showerror("Ledger Error", f"Could not read the ledger:\n{e}", parent=self)
+            return
+
+        ensure_export_folder()
+        filepath = filedialog.asksaveasfilename(
+            parent=self,
+            defaultextension=".xlsx",
+            filetypes=[("Excel Files", "*.xlsx")],
+            initialdir=EXPORT_FOLDER,
+            initialfile="Summary.xlsx",
+            title="Save Summary"
+        )
+        if not filepath:
+            return
+        try:
+            write_summary_workbook(filepath, summaries, measures)
+        except Exception as e:
+            messagebox.showerror("Export Failed", f"Could not save the summary:\n{e}", parent=self)
+            return
+        lots = sum(row[1] for row in next(iter(summaries.values()), ()))
+        self.status_var.set(f"Summarised {lots} lots in {seconds * 1000:.0f} ms; saved to {filepath}")
+
+
+def open_ledger_view(master, ledger):
+    LedgerView(master, ledger)
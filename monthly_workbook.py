@@ -0,0 +1,170 @@
+# monthly_workbook.py
+import json
+import os
+import threading
+from datetime import datetime
+from path_utils import get_resource_path
+from batch_journal import _encode, _decode
+from excel_handler import write_workbook
+from ledger import date_key
+
+# One folder per month: shards/ holds every submitted batch, <YYYY-MM>.xlsx the merged workbook
+MONTHLY_FOLDER = get_resource_path(os.path.join("exports", "monthly"))
+MANIFEST_FILE = "manifest.json"
+MONTH_SOURCE = "Arrival Lot date"
+
+
+def _write_json(path, data):
+    """Write JSON via a temp file + fsync + rename (a file is never seen half written)."""
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, default=_encode, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+class MonthlyWorkbooks:
+    """
+    A running workbook per month, built from immutable shards.
+
+    Each submitted batch is appended as small JSON shards (one per month its
+    lots arrived in), so a submit costs the size of the batch however large
+    the month has grown. A background merge streams a month's shards into
+    <YYYY-MM>.xlsx and records in the month's manifest which shards the
+    workbook holds; months whose shards are all in their workbook are skipped.
+    """
+
+    def __init__(self, columns, folder=MONTHLY_FOLDER):
+        self.columns = list(columns)
+        self.folder = folder
+        self.merging = False
+        self.merge_error = None
+        self._lock = threading.Lock()
+        self._pending = threading.Event()
+        self._thread = None
+
+    # --- Paths ---
+
+    def month_folder(self, month):
+        return os.path.join(self.folder, month)
+
+    def shard_folder(self, month):
+        return os.path.join(self.folder, month, "shards")
+
+    def workbook_path(self, month):
+        return os.path.join(self.folder, month, f"{month}.xlsx")
+
+    def manifest_path(self, month):
+        return os.path.join(self.folder, month, MANIFEST_FILE)
+
+    # --- Submitting ---
+
+    def append_batch(self, rows, submitted_at=None):
+        """
+        Store a submitted batch as one new shard per month (by Arrival Lot date;
+        lots without a readable date go to the month of the submit).
+        :return: list of shard paths written
+        """
+        submitted_at = submitted_at or datetime.now()
+        offset = self.columns.index(MONTH_SOURCE) if MONTH_SOURCE in self.columns else None
+        by_month = {}
+        for row in rows:
+            key = date_key(row[offset]) if offset is not None and offset < len(row) else None
+            month = key[:7] if key else submitted_at.strftime("%Y-%m")
+            by_month.setdefault(month, []).append(list(row))
+
+        stamp = submitted_at.strftime("%Y%m%d_%H%M%S_%f")
+        written = []
+        for month, month_rows in by_month.items():
+            folder = self.shard_folder(month)
+            os.makedirs(folder, exist_ok=True)
+            path = os.path.join(folder, f"{stamp}.json")
+            _write_json(path, {"columns": self.columns, "rows": month_rows})
+            written.append(path)
+        return written
+
+    # --- Merging ---
+
+    def read_manifest(self, month):
+        try:
+            with open(self.manifest_path(month), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"workbook": None, "shards": [], "rows": 0}
+
+    def months(self):
+        if not os.path.isdir(self.folder):
+            return []
+        return sorted(name for name in os.listdir(self.folder)
+                      if os.path.isdir(self.shard_folder(name)))
+
+    def stale_months(self):
+        """Months with shards that their workbook does not include yet."""
+        stale = []
+        for month in self.months():
+            shards = self._shards(month)
+            manifest = self.read_manifest(month)
+            if shards != manifest["shards"] or not os.path.exists(self.workbook_path(month)):
+                stale.append(month)
+        return stale
+
+    def _shards(self, month):
+        return sorted(name for name in os.listdir(self.shard_folder(month))
+                      if name.endswith(".json"))
+
+    def merge_month(self, month):
+        """Rebuild one month's workbook from its shards, then record them in the manifest."""
+        shards = self._shards(month)
+        folder = self.shard_folder(month)
+        counted = [0]
+
+        def rows():
+            for name in shards:
+                with open(os.path.join(folder, name), "r", encoding="utf-8") as f:
+                    shard = json.load(f, object_hook=_decode)
+                col_index = {col: idx for idx, col in enumerate(shard["columns"])}
+                slots = [col_index.get(col) for col in self.columns]
+                for row in shard["rows"]:
+                    counted[0] += 1
+                    yield [row[idx] if idx is not None and idx < len(row) else "" for idx in slots]
+
+        write_workbook(self.workbook_path(month), self.columns, rows())
+        _write_json(self.manifest_path(month), {
+            "workbook": os.path.basename(self.workbook_path(month)),
+            "shards": shards,
+            "rows": counted[0],
+            "merged_at": datetime.now().isoformat(timespec="seconds"),
+        })
+
+    def merge_async(self):
+        """Bring stale months up to date on a background thread (one merge at a time)."""
+        with self._lock:
+            self._pending.set()
+            if self._thread is not None and self._thread.is_alive():
+                return  # the running merge looks again before it stops
+            self.merging = True
+            self._thread = threading.Thread(target=self._merge_loop, name="monthly-merge", daemon=True)
+            self._thread.start()
+
+    def wait(self):
+        """Block until the background merge (if any) has finished."""
+        thread = self._thread
+        if thread is not None:
+            thread.join()
+
+    def _merge_loop(self):
+        while True:
+            with self._lock:
+                if not self._pending.is_set():
+                    self.merging = False
+                    return
+                self._pending.clear()
+            try:
+                for month in self.stale_months():
+                    self.merge_month(month)
+                self.merge_error = None
+            except Exception as e:
+                # The shards are safe; the next merge tries again
+                print(f"Error merging monthly workbook: {e}")
+                self.merge_error = e
@@ -0,0 +1,157 @@
+# partitioned_export.py
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from openpyxl import Workbook
+from excel_handler import (
+    EXPORT_FOLDER, FORMULAS, HEADER_STYLE, add_named_styles, load_formulas, save_durably,
+    write_workbook, _styled_cell,
+)
+from ledger import date_key
+
+# Keys the rows can be split by; "Month" is taken from the Arrival Lot date
+PARTITION_KEYS = ["Party Name", "Mkt Committee", "Month"]
+MONTH_SOURCE = "Arrival Lot date"
+
+INDEX_FILE = "_Index.xlsx"
+UNKNOWN = "(blank)"
+
+
+def partition_label(key, value):
+    """The partition a cell value falls in: the text itself, or YYYY-MM for "Month"."""
+    if key == "Month":
+        parsed = date_key(value)
+        return parsed[:7] if parsed else UNKNOWN
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    text = " ".join(str(value if value is not None else "").split())
+    return text or UNKNOWN
+
+
+def partition_rows(columns, rows, key):
+    """
+    Split rows by ``key``; names differing only in case or spacing go together.
+    :return: {label: [row, ...]} in order of first appearance
+    """
+    offset = columns.index(MONTH_SOURCE if key == "Month" else key)
+    partitions, labels = {}, {}
+    for row in rows:
+        label = partition_label(key, row[offset] if offset < len(row) else None)
+        label = labels.setdefault(label.casefold(), label)
+        partitions.setdefault(label, []).append(row)
+    return partitions
+
+
+def partition_filenames(labels):
+    """A distinct, filesystem-safe workbook name for each label."""
+    names, used = {}, set()
+    for label in labels:
+        stem = re.sub(r'[\\/:*?"<>|\x00-\x1f]', "_", label).strip(" .")[:80] or "_"
+        name, n = stem, 2
+        while name.casefold() in used:
+            name, n = f"{stem} ({n})", n + 1
+        used.add(name.casefold())
+        names[label] = name + ".xlsx"
+    return names
+
+
+def _write_partition(filepath, columns, rows, formulas, mode=FORMULAS):
+    """Worker process entry point: one partition's workbook."""
+    return write_workbook(filepath, columns, rows, formulas=formulas, mode=mode)
+
+
+def write_index(filepath, key, entries):
+    """
+    A workbook listing every partition with a link to its file.
+    :param entries: [(label, row count, file name), ...]
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Index")
+    add_named_styles(wb)
+    for letter, width in zip("ABC", (40, 10, 50)):
+        ws.column_dimensions[letter].width = width
+    ws.append([_styled_cell(ws, name, HEADER_STYLE) for name in (key, "Rows", "Workbook")])
+    for label, count, filename in entries:
+        link = filename.replace('"', '""')
+        ws.append([label, count, f'=HYPERLINK("{link}", "{link}")'])
+    ws.append([_styled_cell(ws, "Total", HEADER_STYLE), sum(count for _, count, _ in entries)])
+    save_durably(wb, filepath)
+
+
+def partition_folder(key):
+    """A new folder under exports/ for one split export, e.g. 20240131_183000_by_Party_Name"""
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return os.path.join(EXPORT_FOLDER, f"{stamp}_by_{key.replace(' ', '_').replace('.', '')}")
+
+
+class PartitionedExportJob:
+    """
+    Writes one workbook per partition in worker processes, then an index workbook
+    linking them. Each workbook is produced by write_workbook(), so formulas are
+    converted exactly as in a normal export. Like ExportJob, the Tk side polls
+    ``written``/``done``; ``total`` is known once the rows have been split, on
+    the worker thread.
+    """
+
+    def __init__(self, columns, rows, key, folder=None, workers=None, mode=FORMULAS):
+        self.columns = list(columns)
+        self.mode = mode  # see excel_handler.EXPORT_MODES
+        self.rows = rows  # list of rows, or a RowStore.snapshot() taken on the Tk thread
+        self.key = key
+        self.folder = folder or partition_folder(key)
+        self.workers = workers or os.cpu_count() or 1
+        self.partitions = {}
+        self.filenames = {}
+        self.total = 0
+        self.written = 0
+        self.index_path = os.path.join(self.folder, INDEX_FILE)
+        self.done = False
+        self.cancelled = False
+        self.error = None
+        self._cancel_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="partitioned-export")
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def wait(self):
+        self._thread.join()
+        return self
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    def _run(self):
+        try:
+            self.partitions = partition_rows(self.columns, self.rows, self.key)
+            self.filenames = partition_filenames(self.partitions)
+            self.total = len(self.partitions)
+            os.makedirs(self.folder, exist_ok=True)
+            formulas = load_formulas()
+            # Largest partitions first, so one big party does not start last
+            order = sorted(self.partitions, key=lambda label: -len(self.partitions[label]))
+            with ProcessPoolExecutor(max_workers=min(self.workers, max(self.total, 1))) as pool:
+                futures = [
+                    pool.submit(_write_partition, os.path.join(self.folder, self.filenames[label]),
+                                self.columns, self.partitions[label], formulas, self.mode)
+                    for label in order
+                ]
+                for future in as_completed(futures):
+                    future.result()
+                    self.written += 1
+                    if self._cancel_event.is_set():
+                        for pending in futures:
+                            pending.cancel()
+                        self.cancelled = True
+                        return
+            write_index(self.index_path, self.key, [
+                (label, len(self.partitions[label]), self.filenames[label])
+                for label in sorted(self.partitions, key=str.casefold)
+            ])
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
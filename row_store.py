@@ -0,0 +1,254 @@
+# row_store.py
+import math
+from array import array
+from bisect import bisect_left
+
+# Deleting up to this many rows shifts the column arrays in place instead of rebuilding them
+DELETE_IN_PLACE = 64
+
+
+class RowStore:
+    """
+    Column-oriented storage for the rows of the current batch.
+
+    Numeric columns live in array('d') (8 bytes a cell; NaN marks a blank cell),
+    with the rare value that is not a finite number (typed text, #DIV/0!, ...)
+    kept in a small per-column side table. Text columns are dictionary encoded:
+    each cell is an index into the column's list of distinct values, so repeated
+    party names, cities and dates are stored once.
+    """
+
+    def __init__(self, columns, numeric_columns=()):
+        self.columns = list(columns)
+        self.col_index = {col: idx for idx, col in enumerate(self.columns)}
+        numeric = set(numeric_columns)
+        self._numeric = [col in numeric for col in self.columns]
+        self._next_id = 1
+        self.clear()
+
+    # --- Size and identity ---
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __iter__(self):
+        return self.iter_rows()
+
+    def clear(self):
+        """Remove every row."""
+        self._ids = array("q")
+        self._data = []       # per column: array('d') or array('I') of text codes
+        self._extra = []      # per numeric column: {row index: raw value}
+        self._texts = []      # per text column: list of distinct values (code -> value)
+        self._codes = []      # per text column: {value: code}
+        for numeric in self._numeric:
+            if numeric:
+                self._data.append(array("d"))
+                self._extra.append({})
+                self._texts.append(None)
+                self._codes.append(None)
+            else:
+                self._data.append(array("I"))
+                self._extra.append(None)
+                self._texts.append([""])
+                self._codes.append({"": 0})
+
+    def row_id(self, index):
+        """Stable id of the row at ``index``; survives inserts and deletes of other rows."""
+        return self._ids[index]
+
+    def row_ids(self):
+        return list(self._ids)
+
+    def indexes_of(self, row_ids):
+        """Current indexes of the given row ids (ids no longer present are skipped)."""
+        wanted = set(row_ids)
+        return [idx for idx, row_id in enumerate(self._ids) if row_id in wanted]
+
+    # --- Writing ---
+
+    def append(self, values):
+        """Append one row (values in column order); returns its row id."""
+        index = len(self._ids)
+        for col_idx, (numeric, column, value) in enumerate(zip(self._numeric, self._data, self._padded(values))):
+            if not numeric:
+                column.append(self._encode_text(col_idx, value))
+            elif value.__class__ is float and value - value == 0.0:
+                column.append(value)  # common case: an already computed number
+            else:
+                column.append(self._encode_number(col_idx, index, value))
+        row_id = self._next_id
+        self._next_id += 1
+        self._ids.append(row_id)
+        return row_id
+
+    def extend(self, rows):
+        for values in rows:
+            self.append(values)
+
+    def set_row(self, index, values):
+        """Replace every value of the row at ``index``."""
+        for col_idx, value in enumerate(self._padded(values)):
+            self._set(col_idx, index, value)
+
+    def update(self, index, changes):
+        """Set some cells of one row: ``changes`` maps column name -> value."""
+        for col, value in changes.items():
+            if col in self.col_index:
+                self._set(self.col_index[col], index, value)
+
+    def set_column(self, column, values, start=0):
+        """Overwrite a column (one value per row), from row ``start`` on."""
+        col_idx = self.col_index[column]
+        for index, value in enumerate(values, start):
+            self._set(col_idx, index, value)
+
+    def set_numbers(self, column, numbers, start=0, extra=None):
+        """
+        Overwrite a numeric column from row ``start`` on in one go.
+        :param numbers: float64 values (array('d') or a numpy array); NaN where blank
+        :param extra: {row index: value} of cells that hold something other than a number
+        """
+        col_idx = self.col_index[column]
+        block = array("d")
+        block.frombytes(numbers.tobytes())
+        stop = start + len(block)
+        self._data[col_idx][start:stop] = block
+        side = self._extra[col_idx]
+        for index in [index for index in side if start <= index < stop]:
+            del side[index]
+        if extra:
+            side.update(extra)
+
+    def delete(self, indexes):
+        """Delete the rows at the given indexes."""
+        doomed = sorted(set(indexes))
+        if not doomed:
+            return
+        gone = set(doomed)
+        if len(doomed) <= DELETE_IN_PLACE:
+            for idx in reversed(doomed):
+                del self._ids[idx]
+                for column in self._data:
+                    del column[idx]
+        else:
+            keep = [idx for idx in range(len(self._ids)) if idx not in gone]
+            self._ids = array("q", (self._ids[idx] for idx in keep))
+            for col_idx, column in enumerate(self._data):
+                self._data[col_idx] = array(column.typecode, (column[idx] for idx in keep))
+        for col_idx, extra in enumerate(self._extra):
+            if extra:
+                # Each kept row moves up by the number of deleted rows above it
+                self._extra[col_idx] = {
+                    idx - bisect_left(doomed, idx): value for idx, value in extra.items() if idx not in gone
+                }
+
+    def delete_ids(self, row_ids):
+        self.delete(self.indexes_of(row_ids))
+
+    # --- Reading ---
+
+    def get(self, index, column):
+        return self._get(self.col_index[column], index)
+
+    def get_row(self, index):
+        """The row at ``index`` as a list in column order."""
+        return [self._get(col_idx, index) for col_idx in range(len(self.columns))]
+
+    def iter_rows(self, start=0, stop=None):
+        stop = len(self._ids) if stop is None else min(stop, len(self._ids))
+        for index in range(start, stop):
+            yield self.get_row(index)
+
+    def snapshot(self):
+        """
+        A copy that later changes to this store do not affect, for a background job.
+        The column arrays are copied whole rather than row by row, so this is cheap
+        on the Tk thread; the job rebuilds rows as it iterates the copy.
+        """
+        copy = RowStore.__new__(RowStore)
+        copy.columns = self.columns
+        copy.col_index = self.col_index
+        copy._numeric = self._numeric
+        copy._next_id = self._next_id
+        copy._ids = self._ids[:]
+        copy._data = [column[:] for column in self._data]
+        copy._extra = [dict(extra) if extra is not None else None for extra in self._extra]
+        copy._texts = [list(texts) if texts is not None else None for texts in self._texts]
+        copy._codes = [dict(codes) if codes is not None else None for codes in self._codes]
+        return copy
+
+    def column_values(self, column, start=0, stop=None):
+        """Values of one column in row order, for rows ``start`` to ``stop`` (all by default)."""
+        col_idx = self.col_index[column]
+        stop = len(self._ids) if stop is None else min(stop, len(self._ids))
+        data = self._data[col_idx][start:stop]
+        if self._numeric[col_idx]:
+            extra = self._extra[col_idx]
+            return [number if number == number else extra.get(index, "")
+                    for index, number in enumerate(data, start)]
+        texts = self._texts[col_idx]
+        return [texts[code] for code in data]
+
+    def column_numbers(self, column, start=0, stop=None):
+        """
+        A numeric column as array('d') (NaN where blank) for rows ``start`` to ``stop``;
+        None for a text column, or if a cell in the range holds something other
+        than a number (column_values() has those).
+        """
+        col_idx = self.col_index[column]
+        if not self._numeric[col_idx]:
+            return None
+        stop = len(self._ids) if stop is None else min(stop, len(self._ids))
+        if any(start <= index < stop for index in self._extra[col_idx]):
+            return None
+        return self._data[col_idx][start:stop]
+
+    # --- Encoding ---
+
+    def _padded(self, values):
+        if len(values) == len(self.columns):
+            return values
+        values = list(values)[:len(self.columns)]
+        return values + [""] * (len(self.columns) - len(values))
+
+    def _set(self, col_idx, index, value):
+        if self._numeric[col_idx]:
+            self._extra[col_idx].pop(index, None)
+            self._data[col_idx][index] = self._encode_number(col_idx, index, value)
+        else:
+            self._data[col_idx][index] = self._encode_text(col_idx, value)
+
+    def _encode_number(self, col_idx, index, value):
+        if value is None or value == "":
+            return math.nan
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            number = float(value)
+        else:
+            try:
+                number = float(str(value).replace(",", ""))
+            except ValueError:
+                number = math.nan
+        if math.isnan(number) or math.isinf(number) or isinstance(value, bool):
+            # Not a plain number: keep the value exactly as entered
+            self._extra[col_idx][index] = value
+            return math.nan
+        return number
+
+    def _encode_text(self, col_idx, value):
+        if value is None:
+            value = ""
+        codes = self._codes[col_idx]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(self._texts[col_idx])
+            self._texts[col_idx].append(value)
+        return code
+
+    def _get(self, col_idx, index):
+        if self._numeric[col_idx]:
+            number = self._data[col_idx][index]
+            if number != number:  # NaN: blank, or a value kept in the side table
+                return self._extra[col_idx].get(index, "")
+            return number
+        return self._texts[col_idx][self._data[col_idx][index]]
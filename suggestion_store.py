@@ -0,0 +1,563 @@
+# suggestion_store.py
+import atexit
+import heapq
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left, insort
+from path_utils import get_resource_path
+
+# Most suggestions shown in the dropdown for one keystroke
+MAX_SUGGESTIONS = 10
+
+# A hit counts half as much after this many seconds (30 days)
+HALF_LIFE = 30 * 24 * 3600
+
+# Prefix ranges up to this size are ranked in full; larger ones (one or two
+# typed letters) take the most used values first, then the rest alphabetically
+RANK_WINDOW = 256
+
+# Large prefix ranges: the best used values kept per prefix, so a keystroke does not
+# rank every used value again
+TOP_USED = 32
+
+# Fuzzy matching: candidates verified per keystroke, and edits tolerated
+FUZZY_CANDIDATES = 32
+NO_RANK = float("-inf")
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def prefix_distance(query, key, limit):
+    """
+    Fewest edits turning ``query`` into ``key`` or into the start of ``key``
+    (optimal string alignment: a swap of neighbouring letters is one edit).
+    Returns limit + 1 once the distance is known to exceed ``limit``.
+    """
+    key = key[:len(query) + limit]  # longer prefixes are more than ``limit`` edits away
+    before, previous = None, list(range(len(key) + 1))
+    for i in range(1, len(query) + 1):
+        current = [i] + [0] * len(key)
+        for j in range(1, len(key) + 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (query[i - 1] != key[j - 1]))
+            if i > 1 and j > 1 and query[i - 1] == key[j - 2] and query[i - 2] == key[j - 1]:
+                current[j] = min(current[j], before[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return min(min(previous), limit + 1)
+
+
+class SuggestionIndex:
+    """
+    Case-insensitive, usage-ranked index over suggestion values.
+
+    Values are kept sorted by their case-folded form, so all values starting
+    with a prefix sit next to each other and are found with one binary search.
+    Prefix matches come first, most used and most recent on top; if there are
+    too few, a trigram index supplies near misses and mid-word matches.
+    """
+
+    def __init__(self, values=(), usage=None):
+        self.usage = {}    # value -> [hit count (decayed), last used (epoch seconds)]
+        self._rank = {}    # value -> rank key; higher is better
+        self._used = []    # sorted (folded value, value) for values with hits
+        self._top = {}     # folded prefix -> best used values (up to TOP_USED), best first
+        self.rebuild(values, usage)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, value):
+        return value in self.values
+
+    def rebuild(self, values, usage=None):
+        self.values = {value for value in values if isinstance(value, str) and value}
+        self._entries = sorted((value.casefold(), value) for value in self.values)  # (folded, value)
+        self._trigrams = None  # trigram -> list of value ids, built on the first fuzzy lookup
+        self._by_id = []
+        self._top = {}
+        if usage is not None:
+            self.usage = {}
+            self._rank = {}
+            self._used = []
+            for value, (count, last_used) in usage.items():
+                if value in self.values and count > 0:
+                    self._set_usage(value, count, last_used)
+
+    def add(self, value):
+        """Insert one value; returns False if it was already indexed."""
+        if not value or value in self.values:
+            return False
+        self.values.add(value)
+        insort(self._entries, (value.casefold(), value))
+        if self._trigrams is not None:
+            self._index_trigrams(value)
+        return True
+
+    def record_hit(self, value, now=None):
+        """Count one use of ``value`` (indexing it if new)."""
+        self.add(value)
+        now = time.time() if now is None else now
+        count, last_used = self.usage.get(value, (0.0, now))
+        count = count * 0.5 ** (max(0.0, now - last_used) / HALF_LIFE) + 1
+        self._set_usage(value, count, now)
+
+    def rank(self, value):
+        return self._rank.get(value, NO_RANK)
+
+    def _set_usage(self, value, count, last_used):
+        old_rank = self._rank.get(value)
+        if old_rank is None:
+            insort(self._used, (value.casefold(), value))
+        # Ordering by count * 0.5 ** ((now - last_used) / HALF_LIFE) is the same
+        # at any "now" as ordering by this key, so it never needs recomputing
+        rank = math.log2(count) + last_used / HALF_LIFE
+        self.usage[value] = [count, last_used]
+        self._rank[value] = rank
+        if self._top:
+            self._update_top(value, rank, old_rank)
+
+    def _update_top(self, value, rank, old_rank):
+        """Move ``value`` within the cached best lists of its prefixes."""
+        folded = value.casefold()
+        for size in range(1, len(folded)):
+            prefix = folded[:size]
+            top = self._top.get(prefix)
+            if top is None:
+                continue
+            if old_rank is not None and rank < old_rank:
+                # A value can only fall out of sight by dropping; rebuild that list when next needed
+                del self._top[prefix]
+                continue
+            if value in top:
+                top.remove(value)
+            position = 0
+            while position < len(top) and self._rank[top[position]] >= rank:
+                position += 1
+            top.insert(position, value)
+            del top[TOP_USED:]
+
+    # --- Lookup ---
+
+    def lookup(self, prefix, limit=MAX_SUGGESTIONS):
+        """Up to ``limit`` suggestions for ``prefix`` (ignoring case), excluding ``prefix`` itself."""
+        folded = prefix.casefold()
+        matches = self._prefix_matches(folded, limit)
+        if len(matches) < limit and len(folded) >= 3:
+            seen = set(matches)
+            matches += [value for value in self._fuzzy_matches(folded) if value not in seen][:limit - len(matches)]
+        return matches
+
+    def _prefix_matches(self, folded, limit):
+        entries = self._entries
+        start = bisect_left(entries, (folded,))
+        stop = start
+        while stop < len(entries) and stop - start <= RANK_WINDOW and entries[stop][0].startswith(folded):
+            stop += 1
+        if stop - start <= RANK_WINDOW:
+            found = [value for key, value in entries[start:stop] if key != folded]
+            found.sort(key=self.rank, reverse=True)  # stable: alphabetical among equals
+            return found[:limit]
+
+        # Large range: used values first, then alphabetical
+        found = self._top_used(folded, limit)
+        if len(found) == limit:
+            return found
+        taken = set(found)
+        for position in range(start, len(entries)):
+            key, value = entries[position]
+            if not key.startswith(folded) or len(found) == limit:
+                break
+            if key != folded and value not in taken:
+                found.append(value)
+        return found
+
+    def _top_used(self, folded, limit):
+        """The ``limit`` best used values starting with ``folded``; cached per prefix."""
+        top = self._top.get(folded)
+        if top is None or limit > TOP_USED:
+            used = []
+            for position in range(bisect_left(self._used, (folded,)), len(self._used)):
+                key, value = self._used[position]
+                if not key.startswith(folded):
+                    break
+                if key != folded:
+                    used.append(value)
+            if limit > TOP_USED:
+                return heapq.nlargest(limit, used, key=self.rank)
+            top = self._top[folded] = heapq.nlargest(TOP_USED, used, key=self.rank)
+        return top[:limit]
+
+    def _fuzzy_matches(self, folded):
+        """Values containing ``folded`` or within a small edit distance of it (or of their start)."""
+        if self._trigrams is None:
+            self._trigrams = {}
+            for value in self.values:
+                self._index_trigrams(value)
+
+        wanted = trigrams(folded)
+        max_edits = 1 if len(folded) < 6 else 2
+        # An edit disturbs at most three trigrams, a swap of neighbours four
+        needed = max(1, len(wanted) - 4 * max_edits)
+        shared = {}
+        for gram in wanted:
+            for value_id in self._trigrams.get(gram, ()):
+                shared[value_id] = shared.get(value_id, 0) + 1
+        candidates = heapq.nlargest(
+            FUZZY_CANDIDATES,
+            (value_id for value_id, count in shared.items() if count >= needed),
+            key=shared.__getitem__,
+        )
+
+        scored = []
+        for value_id in candidates:
+            value = self._by_id[value_id]
+            key = value.casefold()
+            if key == folded or key.startswith(folded):
+                continue  # exact and prefix matches are handled by _prefix_matches
+            distance = 0 if folded in key else prefix_distance(folded, key, max_edits)
+            if distance <= max_edits:
+                scored.append((distance, -self.rank(value), key, value))
+        scored.sort()
+        return [value for *_, value in scored]
+
+    def _index_trigrams(self, value):
+        value_id = len(self._by_id)
+        self._by_id.append(value)
+        for gram in trigrams(value.casefold()):
+            self._trigrams.setdefault(gram, []).append(value_id)
+
+
+# --- Shared suggestion lists ---
+
+# Journal records written before the suggestion files are compacted
+COMPACT_AFTER = 500
+
+# Fields with suggestions, and the file each field's values are kept in
+SUGGESTION_FILES = {
+    "Party Name": "party_name_suggestions.json",
+    "City": "city_suggestions.json",
+    "Agent": "agent_suggestions.json",
+    "Mkt Committee": "mkt_committee_suggestions.json",
+}
+
+
+class SuggestionSource:
+    """
+    The suggestion values of one field, shared by every widget that shows the field.
+    Nothing is read from disk until the first lookup (normally the first focus).
+
+    Changes are appended to a small journal (one JSON record per line) rather
+    than rewriting the lists. Once the journal has COMPACT_AFTER records it is
+    folded into the snapshot files on a background thread, and whatever is
+    left is folded in when the program exits. Snapshots are replaced via a
+    temp file and rename, so a crash can at worst lose the last journal line.
+    """
+
+    def __init__(self, suggestion_file=None, folder=None):
+        self.suggestion_file = suggestion_file
+        self.folder = folder  # where the files live; None means next to the application
+        self.loaded = False
+        self.values = []
+        self.index = SuggestionIndex()
+        self.journal_records = 0
+        self._lock = threading.Lock()             # guards the values and the journal
+        self._compaction_lock = threading.Lock()  # one compaction at a time
+        self._compacting = False
+        self._torn_tail = False  # journal ends mid-line (crash during a write)
+
+    def load(self):
+        if self.loaded:
+            return
+        self.loaded = True
+        values = self.load_suggestions_from_file()
+        usage = self.load_usage_from_file()
+        self.journal_records = self.replay_journal(values, usage)
+        self.values = values
+        self.index.rebuild(values, usage)
+
+    def lookup(self, prefix, limit=MAX_SUGGESTIONS):
+        self.load()
+        return self.index.lookup(prefix, limit)
+
+    def add(self, value):
+        """Record a value committed with a row, adding it if new; returns True if it was new."""
+        self.load()
+        with self._lock:
+            is_new = value not in self.index
+            self.index.record_hit(value)
+            if is_new:
+                self.values.append(value)
+            count, last_used = self.index.usage[value]
+        # The record holds the new totals, so replaying it twice does no harm
+        self.append_journal([["hit", value, count, last_used]])
+        return is_new
+
+    def merge(self, values):
+        """Add any of ``values`` not known yet (no hits recorded); returns how many were new."""
+        self.load()
+        with self._lock:
+            added = [value for value in values if value and self.index.add(value)]
+            self.values.extend(added)
+        self.append_journal([["add", value] for value in added])
+        return len(added)
+
+    def replace(self, values):
+        self.load()
+        with self._lock:
+            self.values = list(values)
+            self.index.rebuild(self.values, self.index.usage)
+        self.compact()
+
+    # --- Files ---
+
+    def path(self, filename):
+        if self.folder is not None:
+            return os.path.join(self.folder, filename)
+        return get_resource_path(filename)
+
+    def usage_file(self):
+        """Hit counts live next to the suggestion list, e.g. city_suggestions_usage.json"""
+        return os.path.splitext(self.suggestion_file)[0] + "_usage.json"
+
+    def journal_file(self):
+        """Changes not yet folded into the lists, e.g. city_suggestions_journal.jsonl"""
+        return os.path.splitext(self.suggestion_file)[0] + "_journal.jsonl"
+
+    def load_suggestions_from_file(self):
+        suggestion_path = self.path(self.suggestion_file) if self.suggestion_file else None
+        if suggestion_path and os.path.exists(suggestion_path):
+            try:
+                with open(suggestion_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if isinstance(data, list):
+                    return data
+            except Exception:
+                pass
+        return []
+
+    def load_usage_from_file(self):
+        if not self.suggestion_file:
+            return {}
+        usage_path = self.path(self.usage_file())
+        if os.path.exists(usage_path):
+            try:
+                with open(usage_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if isinstance(data, dict):
+                    return {
+                        value: (float(hits[0]), float(hits[1])) for value, hits in data.items()
+                        if isinstance(hits, list) and len(hits) == 2
+                    }
+            except Exception:
+                pass
+        return {}
+
+    def replay_journal(self, values, usage):
+        """Apply journal records to freshly loaded ``values``/``usage``; returns the record count."""
+        if not self.suggestion_file:
+            return 0
+        journal_path = self.path(self.journal_file())
+        if not os.path.exists(journal_path):
+            return 0
+        known = set(value for value in values if isinstance(value, str))
+        records = 0
+        try:
+            with open(journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    self._torn_tail = not line.endswith("\n")
+                    try:
+                        record = json.loads(line)
+                        kind, value = record[0], record[1]
+                    except (ValueError, IndexError, TypeError):
+                        continue  # a line cut short by a crash
+                    if not isinstance(value, str) or not value:
+                        continue
+                    if value not in known:
+                        known.add(value)
+                        values.append(value)
+                    if kind == "hit" and len(record) == 4:
+                        count, last_used = float(record[2]), float(record[3])
+                        if last_used >= usage.get(value, (0.0, float("-inf")))[1]:
+                            usage[value] = (count, last_used)
+                    records += 1
+        except OSError as e:
+            print(f"Error reading {journal_path}: {e}")
+        return records
+
+    def append_journal(self, records):
+        """Append records to the journal; O(1) per record however long the lists are."""
+        if not self.suggestion_file or not records:
+            return
+        text = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+        with self._lock:
+            if self._torn_tail:
+                text = "\n" + text  # don't glue the first record onto a half-written line
+                self._torn_tail = False
+            try:
+                with open(self.path(self.journal_file()), 'a', encoding='utf-8') as f:
+                    f.write(text)
+            except OSError as e:
+                print(f"Error saving suggestions to {self.journal_file()}: {e}")
+                return
+            self.journal_records += len(records)
+            start = self.journal_records >= COMPACT_AFTER and not self._compacting
+            if start:
+                self._compacting = True
+        if start:
+            threading.Thread(target=self._compact_in_background, name="suggestion-compaction").start()
+
+    def _compact_in_background(self):
+        try:
+            self.compact()
+        finally:
+            self._compacting = False
+
+    def compact(self):
+        """Fold the journal into the suggestion and usage files, then drop the folded records."""
+        if not self.suggestion_file or not self.loaded:
+            return
+        with self._compaction_lock:
+            self._compact()
+
+    def _compact(self):
+        journal_path = self.path(self.journal_file())
+        with self._lock:
+            values = sorted(set(value for value in self.values if isinstance(value, str)))
+            usage = {value: list(hits) for value, hits in self.index.usage.items()}
+            folded_size = os.path.getsize(journal_path) if os.path.exists(journal_path) else 0
+
+        try:
+            write_atomic(self.path(self.suggestion_file),
+                         json.dumps(values, ensure_ascii=False, indent=2))
+            write_atomic(self.path(self.usage_file()), json.dumps(usage, ensure_ascii=False))
+        except OSError as e:
+            print(f"Error saving suggestions to {self.suggestion_file}: {e}")
+            return
+
+        # Keep only records appended while the snapshot was being written
+        with self._lock:
+            try:
+                with open(journal_path, 'rb') as f:
+                    f.seek(folded_size)
+                    tail = f.read()
+            except OSError:
+                tail = b""
+            try:
+                if tail:
+                    write_atomic(journal_path, tail.decode('utf-8'))
+                elif os.path.exists(journal_path):
+                    os.remove(journal_path)
+            except OSError as e:
+                print(f"Error trimming {journal_path}: {e}")
+                return
+            self.journal_records = tail.count(b"\n")
+
+
+def write_atomic(path, text):
+    """Write ``text`` to a temp file, flush it to disk and rename it over ``path``."""
+    temp_path = path + ".tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+class SuggestionRegistry:
+    """One SuggestionSource per suggestion file for the whole process."""
+
+    def __init__(self, files=SUGGESTION_FILES, folder=None):
+        self.files = dict(files)
+        self.folder = folder
+        self._sources = {}
+
+    def source(self, field=None, suggestion_file=None):
+        """The shared source for ``field`` (or an explicit file); a private empty one if neither is known."""
+        suggestion_file = suggestion_file or self.files.get(field)
+        if not suggestion_file:
+            return SuggestionSource()
+        if suggestion_file not in self._sources:
+            self._sources[suggestion_file] = SuggestionSource(suggestion_file, self.folder)
+        return self._sources[suggestion_file]
+
+    def record(self, field, value):
+        """Count a value committed in ``field``."""
+        if field in self.files and value:
+            self.source(field).add(value)
+
+    def merge(self, new_values):
+        """Add harvested values: ``new_values`` maps field -> iterable of values."""
+        for field, values in new_values.items():
+            if field in self.files:
+                self.source(field).merge(sorted(values))
+
+    def compact_all(self):
+        """Fold every pending journal into its files (called at exit)."""
+        for source in self._sources.values():
+            if source.journal_records:
+                source.compact()
+
+
+suggestion_registry = SuggestionRegistry()
+atexit.register(suggestion_registry.compact_all)
+
+
+# --- Micro-benchmark: python suggestion_store.py ---
+
+def benchmark_lookup(count=100000, lookups=2000):
+    """Time SuggestionIndex lookups over ``count`` synthetic names; returns ms per lookup."""
+    import random
+    rng = random.Random(42)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    names = ["".join(rng.choice(letters) for _ in range(rng.randint(5, 14))).title() for _ in range(count)]
+
+    started = time.perf_counter()
+    index = SuggestionIndex(names)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    for name in rng.sample(names, count // 10):
+        for _ in range(rng.randint(1, 5)):
+            index.record_hit(name, now=rng.uniform(0, 90 * 24 * 3600))
+
+    prefixes = [name[:rng.randint(1, 4)] for name in rng.sample(names, lookups)]
+    started = time.perf_counter()
+    for prefix in prefixes:
+        index.lookup(prefix)
+    lookup_ms = (time.perf_counter() - started) * 1000 / lookups
+
+    # Typos: two neighbouring letters swapped, so only the fuzzy stage can find them
+    typos = []
+    for name in rng.sample([name for name in names if len(name) >= 7], lookups):
+        cut = rng.randint(2, len(name) - 2)
+        typos.append(name[:cut] + name[cut + 1] + name[cut] + name[cut + 2:])
+    index.lookup(typos[0])  # builds the trigram index
+    started = time.perf_counter()
+    for typo in typos:
+        index.lookup(typo)
+    fuzzy_ms = (time.perf_counter() - started) * 1000 / lookups
+
+    # Committing values: journal appends, in a throwaway folder so the shipped lists are untouched
+    with tempfile.TemporaryDirectory() as folder:
+        registry = SuggestionRegistry({"Party Name": "party_name_suggestions.json"}, folder=folder)
+        registry.source("Party Name").load()
+        recorded = rng.sample(names, min(lookups, COMPACT_AFTER - 1))  # stays below a compaction
+        started = time.perf_counter()
+        for name in recorded:
+            registry.record("Party Name", name)
+        record_ms = (time.perf_counter() - started) * 1000 / len(recorded)
+
+    print(f"{len(index)} entries: index built in {build_ms:.1f} ms, "
+          f"{lookup_ms:.4f} ms per 1-4 letter lookup, {fuzzy_ms:.4f} ms per misspelt name, "
+          f"{record_ms:.4f} ms per recorded value")
+    return lookup_ms
+
+
+if __name__ == "__main__":
+    benchmark_lookup()
@@ -0,0 +1,57 @@
+# test_bulk_import.py
+from datetime import date, datetime
+from openpyxl import Workbook
+from bulk_import import parse_file
+from column_schema import ColumnSchema
+from validation import RowValidator
+
+
+def test_excel_date_cells_are_imported_as_typed_dates(tmp_path):
+    path = str(tmp_path / "lots.xlsx")
+    wb = Workbook()
+    ws = wb.active
+    ws.append(["Arrival Lot date", "Bill No.", "Bill Date", "Party Name", "Bags", "Bill Wt (Qtl)"])
+    ws.append([datetime(2024, 1, 5), "B-1", datetime(2024, 1, 4, 15, 30), "Jagraon Traders", 100, 50.5])
+    ws.append([date(2024, 2, 29), "B-2", "03/02/2024", "Jain Mills", 80, 40])
+    wb.save(path)
+
+    schema = ColumnSchema()
+    rows = parse_file(path, schema.spec)["rows"]
+    get = lambda row, col: row[schema.offsets[col]]
+    assert [get(row, "Arrival Lot date") for row in rows] == ["05/01/2024", "29/02/2024"]
+    assert [get(row, "Bill Date") for row in rows] == ["04/01/2024", "03/02/2024"]
+    assert [get(row, "Bags") for row in rows] == [100, 80]
+
+    validator = RowValidator(schema.columns)
+    for row_id, row in enumerate(rows, start=1):
+        validator.check_row(row_id, row)
+    assert not any("Bill Date" in line or "Arrival Lot date" in line
+                   for line in validator.report([1, 2]))
+
+
+def test_view_data_keeps_repeated_rows_and_replaces_the_batch(tmp_path):
+    from entry_batch import EntryBatch
+    from suggestion_store import SuggestionRegistry
+
+    path = str(tmp_path / "lots.xlsx")
+    wb = Workbook()
+    ws = wb.active
+    ws.append(["Arrival Lot date", "Bill No.", "Bill Date", "Party Name", "Vehicle No.", "Bags", "Bill Wt (Qtl)"])
+    for _ in range(2):
+        ws.append(["05/01/2024", "B-1", "04/01/2024", "Jagraon Traders", "PB10", 100, 50.5])
+    wb.save(path)
+
+    batch = EntryBatch(suggestions=SuggestionRegistry(folder=str(tmp_path)))
+    batch.store.append([""] * len(batch.columns))
+    assert batch.load_file(path) == 2
+    assert len(batch) == 2
+    assert batch.totals.lots == 2
+
+    # Cancelled after the first step: the rows read so far stay, the file is closed
+    reader = batch.open_file(path)
+    steps = batch.load_steps(reader, chunk=1)
+    assert next(steps) == 1
+    steps.close()
+    assert len(batch) == 1
+    assert batch.store.get(0, "MRN No.") == 1.0
+    assert reader._wb is None
@@ -0,0 +1,75 @@
+# test_entry_batch.py
+import math
+from types import SimpleNamespace
+from column_schema import ColumnSchema
+from entry_batch import EntryBatch
+from formula_store import get_formula_graph
+from suggestion_store import SuggestionRegistry
+
+
+def make_row(schema, i):
+    row = {col: "" for col in schema.columns}
+    row.update({
+        "Arrival Lot date": "05/01/2024", "Bill No.": f"B-{i}", "Bill Date": "04/01/2024",
+        "Party Name": f"Party {i % 7}", "Vehicle No.": f"PB{i:04d}", "Bags": 100 + i % 5,
+        "Bill Wt (Qtl)": 50.0 + i % 10, "Kanda Wt with Bardana(Qtl)": 50.5,
+        "Basic Rate as per Bill": 2500.0, "Sauda": 2450.0, "Moist(%)": 14.0,
+    })
+    return schema.record(row)
+
+
+def make_batch(tmp_path, count):
+    schema = ColumnSchema()
+    batch = EntryBatch(schema, suggestions=SuggestionRegistry(folder=str(tmp_path)))
+    rows = [make_row(schema, i) for i in range(count)]
+    rows[4][schema.offsets["Bags"]] = "#DIV/0!"  # formula columns reading it hold the error
+    batch.store.extend(rows)
+    batch.reprice_all()
+    batch.reindex()
+    return batch
+
+
+def assert_formulas_match_row_evaluation(batch):
+    graph = get_formula_graph()
+    for index in range(len(batch.store)):
+        row = dict(zip(batch.columns, batch.store.get_row(index)))
+        for col, expected in graph.evaluate(row, index + 2).items():
+            if isinstance(expected, str) or isinstance(row[col], str):
+                assert row[col] == expected, (index, col)
+            else:
+                assert math.isclose(row[col], expected, abs_tol=1e-9), (index, col)
+
+
+def test_removing_rows_renumbers_the_rows_below(tmp_path):
+    batch = make_batch(tmp_path, 300)
+    assert_formulas_match_row_evaluation(batch)
+    batch.remove([0, 2])                   # a few rows: shifted in place
+    batch.remove(list(range(10, 250, 2)))  # many rows: columns rebuilt
+    assert len(batch) == 178
+    assert [batch.store.get(index, "MRN No.") for index in range(3)] == [1.0, 2.0, 3.0]
+    assert batch.store.get(2, "Bags") == "#DIV/0!"
+    assert_formulas_match_row_evaluation(batch)
+
+
+def test_imported_rows_are_added_in_steps_like_a_full_rebuild(tmp_path):
+    batch = make_batch(tmp_path, 50)
+    schema = batch.schema
+    rows = [make_row(schema, i) for i in range(50, 560)]
+    rows[7][schema.offsets["Bill No."]] = ""  # a problem for the validator
+    rows[9] = list(rows[8])                    # repeats the row before it
+    job = SimpleNamespace(rows=rows, suggestions={"Party Name": {"Party 3"}})
+
+    steps = list(batch.import_steps(job, chunk=200))
+    assert steps == [200, 400, 510]
+    assert len(batch) == 560
+    assert_formulas_match_row_evaluation(batch)
+
+    problems, totals = batch.problems(), list(batch.totals.sums)
+    repeated = batch.check_duplicates(dict(zip(batch.columns, rows[8])))
+    assert any("Bill No." in line for line in problems)
+    assert repeated
+    batch.reindex()
+    assert batch.problems() == problems
+    assert batch.totals.lots == 560
+    assert all(math.isclose(a, b) for a, b in zip(batch.totals.sums, totals))
+    assert batch.check_duplicates(dict(zip(batch.columns, rows[8]))) == repeated
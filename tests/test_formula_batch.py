@@ -0,0 +1,80 @@
+# test_formula_batch.py
+import json
+import math
+import os
+import random
+import pytest
+from formula_engine import formula_graph
+from formula_batch import batch_row, evaluate_batch
+
+FORMULAS_JSON = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "formulas.json")
+
+# Formulas that reach the error and rounding paths the shipped ones rarely do
+EDGE_FORMULAS = {
+    "Ratio": "=[A] / [B]",
+    "Rounded": "=ROUND([A], 2)",
+    "Rounded Neg": "=ROUND([A] * -1, 1)",
+    "Rounded Tens": "=ROUND([A], -1)",
+    "Rounded Chain": "=ROUND([Ratio], 0) + [C]",
+    "Power": "=[A] ^ [B]",
+    "Pick": "=IF([A] > [B], MAX([A], [C]), MIN([B], [C]))",
+    "Logic": "=IF(OR(AND([A] > 0, [B] <= 2), NOT([C] = 0)), ABS([A] - [B]), SUM([A], [B], [C]))",
+    "Row": "=ROW() * 2 - [A]",
+}
+
+# Cell values chosen to hit half-way rounding, text, blanks and error values
+POOL = [
+    0, 1, 2, -1, 0.5, 1.5, 2.5, -2.5, 1.005, 2.675, -0.125, 14.999999999, 1e15 + 0.5,
+    3.14159, 12, 15.5, "", None, "7", "1,234.5", " 8 ", "abc", "#DIV/0!", "#VALUE!", True,
+]
+
+
+def _same(scalar, batch):
+    if isinstance(scalar, str) or isinstance(batch, str):
+        return scalar == batch
+    if math.isnan(scalar) and math.isnan(batch):
+        return True
+    return scalar == batch
+
+
+def _compare(formulas, columns, rows):
+    graph = formula_graph(formulas)
+    data = {col: [row.get(col) for row in rows] for col in columns}
+    results = evaluate_batch(graph, data, len(rows))
+    for index, row in enumerate(rows):
+        expected = graph.evaluate(row, index + 2)
+        actual = batch_row(results, index)
+        assert set(actual) == set(expected)
+        for col in expected:
+            assert _same(expected[col], actual[col]), (col, row, expected[col], actual[col])
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_edge_formulas_match_row_by_row(seed):
+    rng = random.Random(seed)
+    rows = [{col: rng.choice(POOL) for col in "ABC"} for _ in range(400)]
+    _compare({col: {"formula": src} for col, src in EDGE_FORMULAS.items()}, "ABC", rows)
+
+
+def test_shipped_formulas_match_row_by_row():
+    with open(FORMULAS_JSON, "r", encoding="utf-8") as f:
+        formulas = json.load(f)
+    inputs = ["Bags", "Bill Wt (Qtl)", "Kanda Wt with Bardana(Qtl)", "Basic Rate as per Bill",
+              "Other Amt", "Sauda", "Moist(%)", "Fungus", "Broken"]
+    rng = random.Random(7)
+    rows = []
+    for _ in range(500):
+        row = {col: round(rng.uniform(0, 3000), rng.choice((0, 1, 2, 3))) for col in inputs}
+        row["Fungus"] = rng.choice((1.5, 2, 2.5, 3, 3.5, rng.uniform(0, 4)))
+        row["Broken"] = rng.choice((12, 15, 16, 17, 18, 19, rng.uniform(10, 20)))
+        row["Moist(%)"] = rng.choice((12, 15, 16.5, 19, rng.uniform(10, 20)))
+        if rng.random() < 0.1:
+            row[rng.choice(inputs)] = rng.choice(("", "abc", 0, "#VALUE!"))
+        rows.append(row)
+    _compare(formulas, inputs, rows)
+
+
+def test_error_codes_come_back_as_excel_errors():
+    graph = formula_graph({"Ratio": {"formula": "=[A] / [B]"}})
+    results = evaluate_batch(graph, {"A": [1, 1, "x"], "B": [0, 4, 1]})
+    assert [batch_row(results, index)["Ratio"] for index in range(3)] == ["#DIV/0!", 0.25, "#VALUE!"]
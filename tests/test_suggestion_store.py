@@ -0,0 +1,48 @@
+# test_suggestion_store.py
+import json
+import random
+from suggestion_store import RANK_WINDOW, SuggestionIndex, SuggestionRegistry
+
+FILES = {"Party Name": "party_name_suggestions.json", "City": "city_suggestions.json"}
+
+
+def test_registry_keeps_its_files_in_the_given_folder(tmp_path):
+    registry = SuggestionRegistry(FILES, folder=str(tmp_path))
+    registry.record("Party Name", "Jagraon Traders")
+    registry.record("Party Name", "Jagraon Traders")
+    registry.record("Party Name", "Jain Mills")
+    registry.merge({"City": {"Ludhiana", "Khanna"}})
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "city_suggestions_journal.jsonl", "party_name_suggestions_journal.jsonl"]
+
+    registry.compact_all()
+    with open(tmp_path / "party_name_suggestions.json", encoding="utf-8") as f:
+        assert json.load(f) == ["Jagraon Traders", "Jain Mills"]
+    with open(tmp_path / "party_name_suggestions_usage.json", encoding="utf-8") as f:
+        assert f.read().count("Jagraon Traders") == 1
+
+    # A new process sees the same lists and the same ranking
+    reloaded = SuggestionRegistry(FILES, folder=str(tmp_path))
+    assert reloaded.source("Party Name").lookup("ja") == ["Jagraon Traders", "Jain Mills"]
+    assert reloaded.source("City").lookup("k") == ["Khanna"]
+
+
+def _full_ranking(index, folded, limit):
+    used = [value for key, value in index._used if key.startswith(folded) and key != folded]
+    used.sort(key=index.rank, reverse=True)
+    return used[:limit]
+
+
+def test_large_prefix_ranges_stay_ranked_as_hits_arrive():
+    rng = random.Random(1)
+    names = sorted({"A" + "".join(rng.choice("abcdefgh") for _ in range(6)) for _ in range(3 * RANK_WINDOW)})
+    index = SuggestionIndex(names)
+    now = 0.0
+    for step in range(3000):
+        now += rng.uniform(0, 3600)
+        # Now and then a hit stamped in the past, as when a journal from another run is replayed
+        index.record_hit(rng.choice(names), now=now if rng.random() < 0.9 else rng.uniform(0, now))
+        if step % 25 == 0:
+            for prefix in ("a", "ab"):
+                assert index._top_used(prefix, 10) == _full_ranking(index, prefix, 10)
+    assert index.lookup("a")[:10] == _full_ranking(index, "a", 10)
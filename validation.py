@@ -0,0 +1,119 @@
+# validation.py
+from datetime import datetime
+
+# What each column must hold. Checked when a row is added or edited, never
+# all at once: "Check Entries" only reports the stored results.
+VALIDATION_RULES = {
+    "Bill No.": {"required": True},
+    "Bill Date": {"required": True, "date": "%d/%m/%Y"},
+    "Bags": {"required": True, "numeric": True},
+    "Bill Wt (Qtl)": {"required": True, "numeric": True},
+    "Kanda Wt with Bardana(Qtl)": {"numeric": True},
+    "Basic Rate as per Bill": {"numeric": True},
+    "Sauda": {"numeric": True},
+    "Moist(%)": {"numeric": True},
+    "Fungus": {"numeric": True},
+    "Broken": {"numeric": True},
+}
+
+DATE_HINTS = {"%d/%m/%Y": "DD/MM/YYYY"}
+
+
+def _required(offset, col):
+    message = f"{col} is empty"
+
+    def check(values):
+        value = values[offset] if offset < len(values) else None
+        if not value or str(value).strip() == "":
+            return message
+    return check
+
+
+def _numeric(offset, col):
+    message = f"{col} must be numeric"
+
+    def check(values):
+        value = values[offset] if offset < len(values) else None
+        if value and not isinstance(value, (int, float)):
+            try:
+                float(str(value).replace(",", ""))  # Remove commas
+            except ValueError:
+                return message
+    return check
+
+
+def _date(offset, col, fmt):
+    message = f"{col} must be in {DATE_HINTS.get(fmt, fmt)} format"
+
+    def check(values):
+        value = values[offset] if offset < len(values) else None
+        if value:
+            try:
+                datetime.strptime(str(value), fmt)
+            except ValueError:
+                return message
+    return check
+
+
+def compile_rules(columns, rules=VALIDATION_RULES):
+    """Turn the rules into one list of checks with the column offsets resolved."""
+    offsets = {col: idx for idx, col in enumerate(columns)}
+    checks = []
+    for kind in ("required", "numeric", "date"):
+        for col, rule in rules.items():
+            if col not in offsets or not rule.get(kind):
+                continue
+            if kind == "required":
+                checks.append(_required(offsets[col], col))
+            elif kind == "numeric":
+                checks.append(_numeric(offsets[col], col))
+            else:
+                checks.append(_date(offsets[col], col, rule["date"]))
+    return checks
+
+
+class RowValidator:
+    """
+    Validates rows as they are added or edited and keeps the outcome per row id,
+    so reporting on a whole batch is a lookup rather than a re-check.
+    """
+
+    def __init__(self, columns, rules=VALIDATION_RULES):
+        self.checks = compile_rules(columns, rules)
+        self.problems = {}  # row id -> tuple of messages (valid rows are absent)
+
+    def validate(self, values):
+        """Messages for one row, in rule order; empty if the row is valid."""
+        found = []
+        for check in self.checks:
+            message = check(values)
+            if message:
+                found.append(message)
+        return tuple(found)
+
+    def check_row(self, row_id, values):
+        problems = self.validate(values)
+        if problems:
+            self.problems[row_id] = problems
+        else:
+            self.problems.pop(row_id, None)
+        return problems
+
+    def forget(self, row_id):
+        self.problems.pop(row_id, None)
+
+    def rebuild(self, store):
+        """Validate every row of a RowStore (after an import, restore or clear)."""
+        self.problems = {}
+        for index, values in enumerate(store.iter_rows()):
+            self.check_row(store.row_id(index), values)
+
+    def report(self, row_ids):
+        """"Row n: message" lines for the rows in ``row_ids`` order (n counts from 1)."""
+        lines = []
+        if not self.problems:
+            return lines
+        for row_number, row_id in enumerate(row_ids, start=1):
+            for message in self.problems.get(row_id, ()):
+                lines.append(f"Row {row_number}: {message}")
+        return lines
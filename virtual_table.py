@@ -0,0 +1,141 @@
+# virtual_table.py
+from tkinter import ttk
+from formula_engine import display_value
+
+
+class VirtualTable(ttk.Frame):
+    """
+    A Treeview that only renders the rows currently in view.
+
+    The data lives in a RowStore; the Treeview holds one item per visible line
+    and is refilled whenever the view scrolls or the store changes, so even
+    hundreds of thousands of rows cost a few dozen Tk items. Selection is kept
+    as a set of store indexes so it survives scrolling.
+    """
+
+    def __init__(self, master, store, height=15):
+        super().__init__(master)
+        self.store = store
+        self.offset = 0          # store index of the first visible row
+        self.visible = height    # number of rows that fit in the widget
+        self.selected = set()    # selected store indexes
+        self._items = []         # Treeview items, one per visible row
+
+        scroll_y = ttk.Scrollbar(self, orient="vertical", command=self.yview)
+        scroll_x = ttk.Scrollbar(self, orient="horizontal")
+        self.scroll_y = scroll_y
+
+        self.tree = ttk.Treeview(
+            self,
+            columns=store.columns,
+            show="headings",
+            xscrollcommand=scroll_x.set,
+            height=height
+        )
+        scroll_x.config(command=self.tree.xview)
+
+        scroll_y.pack(side="right", fill="y")
+        scroll_x.pack(side="bottom", fill="x")
+        self.tree.pack(fill="both", expand=True)
+
+        # Set headings
+        for col in store.columns:
+            self.tree.heading(col, text=col)
+            self.tree.column(col, width=120, anchor="center")
+
+        self.tree.bind("<Configure>", self._on_resize)
+        self.tree.bind("<<TreeviewSelect>>", self._on_select)
+        # A plain click starts a new selection, including rows scrolled out of view
+        self.tree.bind("<ButtonPress-1>", lambda e: self.selected.clear())
+        self.tree.bind("<Control-ButtonPress-1>", lambda e: None)
+        self.tree.bind("<Shift-ButtonPress-1>", lambda e: None)
+        self.tree.bind("<MouseWheel>", lambda e: self.scroll_rows(-3 if e.delta > 0 else 3))
+        self.tree.bind("<Button-4>", lambda e: self.scroll_rows(-3))
+        self.tree.bind("<Button-5>", lambda e: self.scroll_rows(3))
+        self.tree.bind("<Up>", lambda e: self._move_focus(-1))
+        self.tree.bind("<Down>", lambda e: self._move_focus(1))
+        self.tree.bind("<Prior>", lambda e: self.scroll_rows(-self.visible) or "break")
+        self.tree.bind("<Next>", lambda e: self.scroll_rows(self.visible) or "break")
+
+    # --- Public API ---
+
+    def refresh(self, keep_selection=True):
+        """Redraw the visible window after the store changed."""
+        if not keep_selection:
+            self.selected.clear()
+        total = len(self.store)
+        self.offset = max(0, min(self.offset, total - self.visible))
+        count = max(0, min(self.visible, total - self.offset))
+
+        while len(self._items) < count:
+            self._items.append(self.tree.insert("", "end"))
+        while len(self._items) > count:
+            self.tree.delete(self._items.pop())
+
+        for k, item in enumerate(self._items):
+            row = self.store.get_row(self.offset + k)
+            self.tree.item(item, values=[display_value(value) for value in row])
+
+        wanted = [item for k, item in enumerate(self._items) if self.offset + k in self.selected]
+        self.tree.selection_set(wanted)
+
+        if total:
+            self.scroll_y.set(self.offset / total, (self.offset + count) / total)
+        else:
+            self.scroll_y.set(0.0, 1.0)
+
+    def see(self, index):
+        """Scroll so that store row ``index`` is visible."""
+        if index < self.offset:
+            self.offset = index
+        elif index >= self.offset + self.visible:
+            self.offset = index - self.visible + 1
+        self.refresh()
+
+    def scroll_rows(self, amount):
+        self.offset += amount
+        self.refresh()
+
+    def index_of(self, item):
+        """Store index of a visible Treeview item."""
+        return self.offset + self._items.index(item)
+
+    def selected_indexes(self):
+        return sorted(self.selected)
+
+    def yview(self, *args):
+        """Scrollbar command: ("moveto", fraction) or ("scroll", n, "units"|"pages")."""
+        if args[0] == "moveto":
+            self.offset = int(float(args[1]) * len(self.store))
+        elif args[0] == "scroll":
+            step = int(args[1])
+            self.offset += step * (self.visible if args[2] == "pages" else 1)
+        self.refresh()
+
+    # --- Event handlers ---
+
+    def _on_resize(self, event):
+        row_height = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        visible = max(1, (event.height - 25) // row_height)
+        if visible != self.visible:
+            self.visible = visible
+            self.refresh()
+
+    def _on_select(self, event=None):
+        current = set(self.tree.selection())
+        on_screen = range(self.offset, self.offset + len(self._items))
+        self.selected.difference_update(on_screen)
+        self.selected.update(self.offset + k for k, item in enumerate(self._items) if item in current)
+
+    def _move_focus(self, step):
+        """Arrow keys: move the selection, scrolling when it leaves the visible window."""
+        if not len(self.store):
+            return "break"
+        focus = self.tree.focus()
+        index = self.index_of(focus) if focus in self._items else self.offset
+        index = max(0, min(len(self.store) - 1, index + step))
+        self.selected = {index}
+        self.see(index)
+        item = self._items[index - self.offset]
+        self.tree.focus(item)
+        return "break"